@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from metrics import Counter, Gauge
+
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected with 503 by route class", ("route_class", "reason"))
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests by route class", ("route_class",))
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for admission by route class", ("route_class",))
+
+
+class RouteClass:
+    """Concurrency budget for one class of routes.
+
+    `share` is the fraction of the global limit this class may use, so lower
+    priority classes are shed first as the server fills up.
+    """
+
+    def __init__(self, name: str, priority: int, limit: int, queue: int, share: float, timeout: float):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue = queue
+        self.share = share
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+def _budget(name: str, default: str):
+    """Read "limit/queue" for a class from ADMISSION_<NAME>"""
+    limit, queue = os.environ.get(f"ADMISSION_{name.upper()}", default).split("/")
+    return int(limit), int(queue)
+
+
+def default_route_classes():
+    timeout = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+    specs = [
+        # name, priority (higher is served first), default "limit/queue", share of global limit
+        ("checkout", 4, "60/200", 1.0),
+        ("auth", 3, "40/100", 0.8),
+        ("catalog", 2, "100/200", 0.8),
+        ("default", 2, "50/100", 0.8),
+        ("admin", 1, "20/20", 0.6),
+    ]
+    classes = {}
+    for name, priority, default, share in specs:
+        limit, queue = _budget(name, default)
+        # Checkout waits longer before giving up: a shed checkout is a lost order
+        classes[name] = RouteClass(name, priority, limit, queue, share, timeout * 2 if name == "checkout" else timeout)
+    return classes
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    if not path.startswith("/api/"):
+        return None
+    if path.startswith("/api/auth/"):
+        return "auth"
+    if path.startswith("/api/payment/") or (path == "/api/orders" and method == "POST"):
+        return "checkout"
+    if path.startswith("/api/admin/"):
+        return "admin"
+    if path.startswith(("/api/products", "/api/categories", "/api/service-types", "/api/pincode", "/api/catalog")):
+        return "catalog"
+    return "default"
+
+
+class AdmissionController:
+    def __init__(self, global_limit: int, classes: Dict[str, RouteClass]):
+        self.global_limit = global_limit
+        self.classes = classes
+        self.in_flight = 0
+
+    def _can_admit(self, route_class: RouteClass) -> bool:
+        return (route_class.in_flight < route_class.limit
+                and self.in_flight < self.global_limit * route_class.share)
+
+    def _admit(self, route_class: RouteClass):
+        route_class.in_flight += 1
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.inc(route_class=route_class.name)
+
+    async def acquire(self, route_class: RouteClass) -> Optional[str]:
+        """Admit the request, or return why it was shed"""
+        if not route_class.waiters and self._can_admit(route_class):
+            self._admit(route_class)
+            return None
+        if len(route_class.waiters) >= route_class.queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        route_class.waiters.append(waiter)
+        ADMISSION_QUEUED.inc(route_class=route_class.name)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), route_class.timeout)
+            return None
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the timeout fired; keep the slot
+                return None
+            waiter.cancel()
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted, but the request went away before it could run; give the slot back
+                self.release(route_class)
+            waiter.cancel()
+            raise
+        finally:
+            ADMISSION_QUEUED.dec(route_class=route_class.name)
+            if waiter in route_class.waiters:
+                route_class.waiters.remove(waiter)
+
+    def release(self, route_class: RouteClass):
+        route_class.in_flight -= 1
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec(route_class=route_class.name)
+        self._wake()
+
+    def _wake(self):
+        # Hand freed capacity to the highest-priority class that can use it
+        for route_class in sorted(self.classes.values(), key=lambda c: -c.priority):
+            while route_class.waiters and self._can_admit(route_class):
+                waiter = route_class.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._admit(route_class)
+                waiter.set_result(True)
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware bounding concurrent requests per route class.
+
+    Requests over budget wait in a bounded per-class queue; when the queue is full
+    or the wait times out they get an immediate 503 with Retry-After instead of
+    piling up on the event loop.
+    """
+
+    def __init__(self, app, global_limit: Optional[int] = None, classes: Optional[Dict[str, RouteClass]] = None):
+        self.app = app
+        self.enabled = os.environ.get("ADMISSION_CONTROL", "true").lower() == "true"
+        self.controller = AdmissionController(
+            global_limit or int(os.environ.get("ADMISSION_GLOBAL_LIMIT", "200")),
+            classes or default_route_classes(),
+        )
+
+    async def __call__(self, scope, receive, send):
+        name = classify(scope["method"], scope["path"]) if scope["type"] == "http" and self.enabled else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classes[name]
+        reason = await self.controller.acquire(route_class)
+        if reason is not None:
+            ADMISSION_SHED.inc(route_class=name, reason=reason)
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
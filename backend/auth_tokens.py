@@ -0,0 +1,73 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+import jwt
+
+from metrics import Counter
+
+ACCESS_TOKEN_TTL = timedelta(minutes=int(os.environ.get("ACCESS_TOKEN_MINUTES", "15")))
+REFRESH_TOKEN_TTL = timedelta(days=int(os.environ.get("REFRESH_TOKEN_DAYS", "7")))
+VERIFIED_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+
+AUTH_TOKEN_VERIFICATIONS = Counter(
+    "auth_token_verifications_total", "Bearer token checks by result", ("result",)
+)
+
+
+class TokenError(Exception):
+    pass
+
+
+class TokenVerifier:
+    """Issues and verifies HS256 tokens with PyJWT, remembering tokens it has already verified.
+
+    A verified token is cached until its `exp`. The cache is keyed on the whole
+    token string, never on the signature alone, so a cached entry can only match
+    the exact header and claims that were checked. Entries are evicted least
+    recently used once `max_entries` is reached.
+    """
+
+    def __init__(self, secret: str, algorithm: str = "HS256", max_entries: int = VERIFIED_CACHE_SIZE):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.max_entries = max_entries
+        self._verified: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+
+    def issue(self, claims: Dict, token_type: str, ttl: timedelta) -> str:
+        now = datetime.now(timezone.utc)
+        return jwt.encode({**claims, "typ": token_type, "iat": now, "exp": now + ttl}, self.secret, algorithm=self.algorithm)
+
+    def verify(self, token: str, token_type: str = "access") -> Dict:
+        """Claims of a valid, unexpired token of `token_type`; raises TokenError otherwise"""
+        claims = self._decode(token)
+        # Tokens from before typed tokens existed were all access tokens
+        if claims.get("typ", "access") != token_type:
+            raise TokenError("Wrong token type")
+        return claims
+
+    def _decode(self, token: str) -> Dict:
+        cached = self._verified.get(token)
+        if cached is not None:
+            claims, expires_at = cached
+            if expires_at > time.time():
+                self._verified.move_to_end(token)
+                AUTH_TOKEN_VERIFICATIONS.inc(result="cached")
+                return claims
+            del self._verified[token]
+
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=[self.algorithm], options={"require": ["exp", "sub"]})
+        except jwt.ExpiredSignatureError:
+            AUTH_TOKEN_VERIFICATIONS.inc(result="expired")
+            raise TokenError("Token expired")
+        except jwt.InvalidTokenError:
+            AUTH_TOKEN_VERIFICATIONS.inc(result="invalid")
+            raise TokenError("Invalid token")
+        AUTH_TOKEN_VERIFICATIONS.inc(result="verified")
+        self._verified[token] = (claims, claims["exp"])
+        if len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+        return claims
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Dict, Optional
+
+
+class BusinessNameCache:
+    """In-process map of business id -> name used to denormalize product writes.
+
+    Misses fall through to Mongo once; writes made through this process update
+    the entry directly via `set` or `invalidate`.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_name(self, db, business_id: str) -> Optional[str]:
+        name = self._names.get(business_id)
+        if name is not None:
+            return name
+        async with self._lock:
+            name = self._names.get(business_id)
+            if name is None:
+                business = await db.businesses.find_one({"id": business_id}, {"_id": 0, "name": 1})
+                if business is None:
+                    return None
+                name = business["name"]
+                self._names[business_id] = name
+        return name
+
+    def set(self, business_id: str, name: str):
+        self._names[business_id] = name
+
+    def invalidate(self, business_id: Optional[str] = None):
+        if business_id is None:
+            self._names.clear()
+        else:
+            self._names.pop(business_id, None)
+
+
+business_names = BusinessNameCache()
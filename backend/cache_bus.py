@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = "cache_versions"
+WATCHED_COLLECTIONS = ["products", "businesses", "users"]
+# "$changeStream is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "In-process cache invalidations by collection and source", ("collection", "source")
+)
+
+# Called with the collection name and the changed document's `id`, or None to drop everything
+Subscriber = Callable[[str, Optional[str]], None]
+
+
+async def bump_version(db, collection: str) -> int:
+    """Record a write to `collection` so polling workers drop their cached copies"""
+    doc = await db[VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": collection},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+class CacheInvalidationBus:
+    """Keeps in-process caches consistent across uvicorn workers.
+
+    Each worker follows a MongoDB change stream on the watched collections. Where
+    change streams are unavailable (standalone mongod) it polls a version document
+    per collection instead, so every worker converges within `poll_interval` seconds.
+    Writers call `publish` after changing a watched collection.
+    """
+
+    def __init__(self, db, mode: Optional[str] = None, poll_interval: Optional[float] = None):
+        self.db = db
+        self.mode = mode or os.environ.get("CACHE_INVALIDATION", "auto")
+        self.poll_interval = poll_interval or float(os.environ.get("CACHE_POLL_INTERVAL_SECONDS", "2"))
+        self.active_mode = None
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._versions: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, collection: str, callback: Subscriber):
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def _notify(self, collection: str, doc_id: Optional[str], source: str):
+        CACHE_INVALIDATIONS.inc(collection=collection, source=source)
+        for callback in self._subscribers.get(collection, []):
+            try:
+                callback(collection, doc_id)
+            except Exception as e:
+                logger.error(f"Cache invalidation callback failed for {collection}: {e}")
+
+    async def publish(self, collection: str, doc_id: Optional[str] = None):
+        if self.mode == "off":
+            return
+        try:
+            version = await bump_version(self.db, collection)
+        except PyMongoError as e:
+            logger.error(f"Failed to publish cache invalidation for {collection}: {e}")
+            return
+        # Our own bump needs no local reload, unless another worker bumped in between
+        if self._versions.get(collection, 0) + 1 == version:
+            self._versions[collection] = version
+
+    async def start(self):
+        if self.mode == "off" or self._task is not None:
+            return
+        await self._load_versions()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _load_versions(self):
+        docs = await self.db[VERSIONS_COLLECTION].find({"_id": {"$in": WATCHED_COLLECTIONS}}).to_list(None)
+        self._versions = {doc["_id"]: doc["version"] for doc in docs}
+
+    async def _run(self):
+        if self.mode in ("auto", "change_stream"):
+            try:
+                await self._watch()
+                return
+            except (OperationFailure, NotImplementedError) as e:
+                if self.mode == "change_stream":
+                    raise
+                logger.info(f"Change streams unavailable ({e}); polling cache versions")
+        await self._poll()
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+        resume_after = None
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup", resume_after=resume_after) as stream:
+                    self.active_mode = "change_stream"
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        collection = change["ns"]["coll"]
+                        doc = change.get("fullDocument") or {}
+                        # Deletes carry no document, so the whole collection is dropped
+                        self._notify(collection, doc.get("id"), "change_stream")
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED or self.active_mode != "change_stream":
+                    raise
+                # Resume token lost (e.g. oplog rolled over): drop everything and start fresh
+                logger.warning("Change stream could not resume; invalidating all caches")
+                for collection in WATCHED_COLLECTIONS:
+                    self._notify(collection, None, "change_stream")
+                resume_after = None
+            except PyMongoError as e:
+                logger.warning(f"Change stream interrupted: {e}; reconnecting")
+                await asyncio.sleep(1)
+
+    async def _poll(self):
+        self.active_mode = "poll"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                docs = await self.db[VERSIONS_COLLECTION].find({"_id": {"$in": WATCHED_COLLECTIONS}}).to_list(None)
+            except PyMongoError as e:
+                logger.warning(f"Cache version poll failed: {e}")
+                continue
+            for doc in docs:
+                if doc["version"] != self._versions.get(doc["_id"]):
+                    self._versions[doc["_id"]] = doc["version"]
+                    self._notify(doc["_id"], None, "poll")
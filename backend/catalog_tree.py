@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TREE_PRODUCT_FIELDS = (
+    "id", "business_id", "business_name", "service_type", "category", "subcategory",
+    "name", "price", "icon_url", "sort_order", "category_sort_order", "subcategory_sort_order",
+)
+TREE_PROJECTION = {"_id": 0, **{field: 1 for field in TREE_PRODUCT_FIELDS}}
+# Fields repeated by the enclosing levels are dropped from each product entry
+PRODUCT_ENTRY_FIELDS = ("id", "business_id", "business_name", "name", "price", "icon_url")
+
+
+def _order_key(sort_order: Optional[int], name: Optional[str]) -> Tuple:
+    # Explicit sort orders first, then alphabetical; unnamed groups go last
+    return (sort_order is None, sort_order if sort_order is not None else 0, name is None, name or "")
+
+
+def _min_order(current: Optional[int], value: Optional[int]) -> Optional[int]:
+    if value is None:
+        return current
+    return value if current is None else min(current, value)
+
+
+def build_catalog_tree(products: Iterable[Dict]) -> Dict:
+    """Group products into service type -> category -> subcategory -> products, in display order"""
+    service_types: Dict[str, Dict] = {}
+    count = 0
+    for product in products:
+        count += 1
+        service_type = service_types.setdefault(product.get("service_type"), {"categories": {}})
+        category = service_type["categories"].setdefault(
+            product.get("category"), {"sort_order": None, "subcategories": {}}
+        )
+        category["sort_order"] = _min_order(category["sort_order"], product.get("category_sort_order"))
+        subcategory = category["subcategories"].setdefault(
+            product.get("subcategory"), {"sort_order": None, "products": []}
+        )
+        subcategory["sort_order"] = _min_order(subcategory["sort_order"], product.get("subcategory_sort_order"))
+        subcategory["products"].append(product)
+
+    def subcategory_nodes(subcategories: Dict) -> List[Dict]:
+        nodes = []
+        for name, node in sorted(subcategories.items(), key=lambda item: _order_key(item[1]["sort_order"], item[0])):
+            products_sorted = sorted(node["products"], key=lambda p: _order_key(p.get("sort_order"), p.get("name")))
+            nodes.append({
+                "name": name,
+                "products": [{field: p.get(field) for field in PRODUCT_ENTRY_FIELDS} for p in products_sorted],
+            })
+        return nodes
+
+    return {
+        "product_count": count,
+        "service_types": [
+            {
+                "name": service_type_name,
+                "categories": [
+                    {"name": category_name, "subcategories": subcategory_nodes(category["subcategories"])}
+                    for category_name, category in sorted(
+                        service_type["categories"].items(),
+                        key=lambda item: _order_key(item[1]["sort_order"], item[0]),
+                    )
+                ],
+            }
+            for service_type_name, service_type in sorted(service_types.items(), key=lambda item: _order_key(None, item[0]))
+        ],
+    }
+
+
+class CatalogTreeCache:
+    """Serialized catalog tree, built once per catalog version.
+
+    Product writes call `invalidate`; the next request rebuilds the tree from a
+    single products query and every request after that is served from memory.
+    """
+
+    def __init__(self):
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self, collection) -> Tuple[bytes, str]:
+        if self._body is not None:
+            return self._body, self._etag
+        async with self._lock:
+            if self._body is None:
+                generation = self._generation
+                products = await collection.find({}, TREE_PROJECTION).to_list(None)
+                body = json.dumps(build_catalog_tree(products), separators=(",", ":")).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                # A write that landed mid-build leaves this tree uncached so the next request rebuilds
+                if generation != self._generation:
+                    return body, etag
+                self._body, self._etag = body, etag
+        return self._body, self._etag
+
+    def invalidate(self, *_):
+        self._generation += 1
+        self._body = None
+        self._etag = None
+
+
+catalog_tree = CatalogTreeCache()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+# Modules that must only load on first use, never while a worker boots
+DEFERRED_MODULES = ["stripe", "resend", "passlib", "pandas", "numpy", "boto3"]
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 1000))
+
+
+def import_times(module: str):
+    """Run `python -X importtime -c "import <module>"` and return {module: cumulative µs}"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "startup_check")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def best_import_times(runs: int = 3):
+    """Fastest of `runs` cold imports of the server, to ignore disk cache noise"""
+    best = None
+    for _ in range(runs):
+        times = import_times("server")
+        if best is None or times["server"] < best["server"]:
+            best = times
+    return best
+
+
+def budget_failures(times, budget_ms: float):
+    """Reasons the measured startup is over budget; empty when it is within"""
+    failures = []
+    loaded = [name for name in DEFERRED_MODULES if name in times]
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+    total_ms = times["server"] / 1000
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget of {budget_ms:.0f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the server exceeds the cold-start budget")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs, to ignore disk cache noise")
+    args = parser.parse_args()
+
+    best = best_import_times(args.runs)
+    print(f"import server: {best['server'] / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    slowest = sorted(((t, name) for name, t in best.items() if "." not in name and name != "server"), reverse=True)
+    for micros, name in slowest[:8]:
+        print(f"   {name:<24} {micros / 1000:>8.1f} ms")
+
+    failures = budget_failures(best, args.budget_ms)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
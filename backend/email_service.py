@@ -1,20 +1,30 @@
 import os
 import asyncio
 import logging
-import resend
+from functools import lru_cache
 from typing import List, Dict
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Configure Resend
-resend.api_key = os.environ.get("RESEND_API_KEY")
 SENDER_EMAIL = os.environ.get("SENDER_EMAIL", "support@laundry-express.co.uk")
 ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "support@laundry-express.co.uk")
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def get_resend():
+    """Import and configure the Resend SDK on first send; rendering templates does not need it"""
+    import resend
+    resend.api_key = os.environ.get("RESEND_API_KEY")
+    return resend
+
+
+def _send(params: Dict):
+    return get_resend().Emails.send(params)
+
+
 def generate_order_confirmation_email(order_data: Dict) -> str:
     """Generate HTML email for order confirmation sent to customer"""
     
@@ -378,7 +388,7 @@ async def send_order_confirmation_email(order_data: Dict, recipient_email: str):
             "html": html_content
         }
         
-        email = await asyncio.to_thread(resend.Emails.send, params)
+        email = await asyncio.to_thread(_send, params)
         logger.info(f"Order confirmation email sent to {recipient_email}, email_id: {email.get('id')}")
         return {"status": "success", "email_id": email.get("id")}
     except Exception as e:
@@ -398,7 +408,7 @@ async def send_status_update_email(order_data: Dict, new_status: str, recipient_
             "html": html_content
         }
         
-        email = await asyncio.to_thread(resend.Emails.send, params)
+        email = await asyncio.to_thread(_send, params)
         logger.info(f"Status update email sent to {recipient_email}, email_id: {email.get('id')}")
         return {"status": "success", "email_id": email.get("id")}
     except Exception as e:
@@ -418,7 +428,7 @@ async def send_admin_order_notification(order_data: Dict):
             "html": html_content
         }
         
-        email = await asyncio.to_thread(resend.Emails.send, params)
+        email = await asyncio.to_thread(_send, params)
         logger.info(f"Admin notification email sent, email_id: {email.get('id')}")
         return {"status": "success", "email_id": email.get("id")}
     except Exception as e:
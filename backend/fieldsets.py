@@ -0,0 +1,33 @@
+from typing import Dict, Iterable, List, Optional
+
+from order_views import SUMMARY_PROJECTION
+
+# Fields each list endpoint may return through `fields=`; anything else is rejected
+PRODUCT_FIELDS = (
+    "id", "business_id", "business_name", "service_type", "category", "subcategory", "name", "price",
+    "icon_url", "sort_order", "category_sort_order", "subcategory_sort_order", "created_at",
+)
+BUSINESS_FIELDS = ("id", "name", "owner_email", "pin_codes", "created_at")
+ORDER_LIST_FIELDS = tuple(field for field in SUMMARY_PROJECTION if field != "_id") + (
+    "user_id", "address", "pin_code", "payment_method", "pickup_instruction", "delivery_instruction",
+)
+
+
+def select_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields` value; None means the endpoint's full default view"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    # Rows are always keyed by id, so clients can match them up
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+
+def projection(fields: Optional[List[str]], default: Optional[Dict] = None) -> Dict:
+    """Mongo projection for the selected fields, taking computed fields from `default`"""
+    default = default or {"_id": 0}
+    if fields is None:
+        return default
+    return {"_id": 0, **{field: default.get(field, 1) for field in fields}}
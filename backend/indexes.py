@@ -0,0 +1,44 @@
+from typing import Dict, List, Tuple
+
+# Every index the API relies on, keyed by collection. Created at startup and by
+# the query plan guard, so both always agree on what the planner can use.
+INDEXES: Dict[str, List[List[Tuple[str, int]]]] = {
+    "users": [
+        [("email", 1)],
+        [("id", 1)],
+    ],
+    "businesses": [
+        [("id", 1)],
+        [("pin_codes", 1)],
+        [("owner_email", 1)],
+    ],
+    "products": [
+        [("id", 1)],
+        [("business_id", 1), ("category", 1), ("subcategory", 1), ("name", 1)],
+        [("category", 1), ("sort_order", 1), ("name", 1)],
+        [("sort_order", 1), ("name", 1)],
+    ],
+    "orders": [
+        [("id", 1)],
+        [("order_number", -1)],
+        [("user_id", 1), ("created_at", -1)],
+        [("created_at", -1)],
+        # Business admins only ever see their own businesses' orders
+        [("business_id", 1), ("created_at", -1)],
+        [("business_id", 1), ("pickup_date", 1), ("status", 1)],
+    ],
+    "stripe_events": [
+        [("status", 1), ("next_attempt_at", 1)],
+    ],
+    "archived_orders": [
+        [("id", 1)],
+        [("order_number", -1)],
+        [("business_id", 1), ("created_at", -1)],
+    ],
+}
+
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        for keys in indexes:
+            await db[collection].create_index(keys)
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import logging
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jobs import JobWorker
+from metrics import render_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int):
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+async def _main(args):
+    # The API module registers the job types and schedules
+    from server import client, job_queue
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    worker = JobWorker(job_queue, poll_interval=args.poll_interval)
+    try:
+        await job_queue.ensure_indexes()
+        await worker.start()
+        logger.info(f"Job worker {worker.worker_id} running {', '.join(sorted(job_queue.types))}")
+        await stopping.wait()
+    finally:
+        await worker.stop()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued background jobs outside the API process")
+    parser.add_argument("--poll-interval", type=float, help="Seconds between queue polls (default JOB_POLL_SECONDS or 1)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "jobs"
+SCHEDULES_COLLECTION = "job_schedules"
+# Finished jobs stay around for inspection, then Mongo expires them
+DONE_RETENTION = timedelta(days=7)
+FAILED_RETENTION = timedelta(days=30)
+MAX_BACKOFF_SECONDS = 3600
+DEPTH_REFRESH_SECONDS = 15
+
+JOB_QUEUE_DEPTH = Gauge("job_queue_depth", "Jobs by type and status", ("type", "status"))
+JOB_QUEUE_OLDEST_DUE = Gauge("job_queue_oldest_due_seconds", "Age of the oldest due, unclaimed job", ("type",))
+JOB_WAIT = Histogram(
+    "job_wait_seconds", "Time from a job being due to a worker starting it", ("type",),
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+JOB_DURATION = Histogram("job_duration_seconds", "Job run time", ("type", "outcome"))
+JOB_RUNS = Counter("job_runs_total", "Job runs by type and outcome", ("type", "outcome"))
+
+Handler = Callable[[Dict], Awaitable[None]]
+
+
+def _utc(value: datetime) -> datetime:
+    # Motor hands datetimes back naive unless the client is tz_aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class CronSchedule:
+    """Standard five-field cron expression (minute hour day-of-month month day-of-week), in UTC.
+
+    Fields take `*`, numbers, ranges, lists and steps (`*/15`, `1-5`, `0,30`).
+    Day of week runs 0-6 from Sunday, and 7 is also Sunday. As in cron, if day
+    of month and day of week are both restricted, a day matching either fires.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(bound) for bound in span.split("-", 1))
+            else:
+                start = end = int(span)
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`"""
+        moment = _utc(moment).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Jumps to the next month, day or hour whenever a coarser field misses, so this stays short
+        for _ in range(100_000):
+            if moment.month not in self.months:
+                year, month = divmod(moment.year * 12 + moment.month, 12)
+                moment = moment.replace(year=year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Handler
+    concurrency: int = 1
+    max_attempts: int = 5
+    lease_seconds: int = 60
+    backoff_seconds: int = 30
+
+
+@dataclass
+class Schedule:
+    name: str
+    cron: CronSchedule
+    job_type: str
+    payload: Dict
+
+
+class JobQueue:
+    """Durable queue of deferred work in the `jobs` collection.
+
+    A job is claimed atomically with `find_one_and_update`. The claim moves it to
+    `running` under a lease that the worker keeps extending while the handler runs.
+    If a worker dies, its lease runs out and another worker takes the job again.
+    Failed runs are retried with exponential backoff up to the type's
+    `max_attempts`. Handlers must therefore be safe to run more than once.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.types: Dict[str, JobType] = {}
+        self.schedules: Dict[str, Schedule] = {}
+        self.enqueued = asyncio.Event()
+
+    @property
+    def jobs(self):
+        return self.db[JOBS_COLLECTION]
+
+    def job(self, name: str, **options):
+        """Register the decorated coroutine as the handler for job type `name`"""
+        def register(handler: Handler) -> Handler:
+            self.types[name] = JobType(name, handler, **options)
+            return handler
+        return register
+
+    def cron(self, name: str, expression: str, job_type: str, payload: Optional[Dict] = None):
+        """Enqueue `job_type` whenever `expression` fires; only one worker enqueues each run"""
+        cron = CronSchedule(expression)
+        # Fail at startup rather than in the worker loop for expressions like `0 0 31 2 *`
+        cron.next_after(datetime.now(timezone.utc))
+        self.schedules[name] = Schedule(name, cron, job_type, payload or {})
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index([("status", 1), ("type", 1), ("run_at", 1)])
+        await self.jobs.create_index("expire_at", expireAfterSeconds=0)
+
+    async def enqueue(self, job_type: str, payload: Optional[Dict] = None, run_at: Optional[datetime] = None,
+                      delay: float = 0, unique_key: Optional[str] = None) -> str:
+        """Queue a job and return its id. A `unique_key` makes repeated enqueues a no-op"""
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type: {job_type}")
+        now = datetime.now(timezone.utc)
+        job_id = unique_key or str(uuid.uuid4())
+        try:
+            await self.jobs.insert_one({
+                "_id": job_id,
+                "type": job_type,
+                "payload": payload or {},
+                "status": "queued",
+                "attempts": 0,
+                "run_at": run_at or now + timedelta(seconds=delay),
+                "created_at": now,
+            })
+        except DuplicateKeyError:
+            return job_id
+        self.enqueued.set()
+        return job_id
+
+    async def fail_abandoned(self, job_type: JobType) -> int:
+        """Fail jobs whose lease ran out on their last attempt, e.g. because they keep crashing their worker"""
+        now = datetime.now(timezone.utc)
+        result = await self.jobs.update_many(
+            {"type": job_type.name, "status": "running", "lease_until": {"$lt": now},
+             "attempts": {"$gte": job_type.max_attempts}},
+            {
+                "$set": {
+                    "status": "failed",
+                    "last_error": "Lease expired on the final attempt",
+                    "finished_at": now,
+                    "expire_at": now + FAILED_RETENTION,
+                },
+                "$unset": {"lease_until": ""},
+            },
+        )
+        if result.modified_count:
+            logger.error(f"Failed {result.modified_count} {job_type.name} jobs whose final attempt never finished")
+        return result.modified_count
+
+    async def claim(self, job_type: JobType, worker_id: str) -> Optional[Dict]:
+        now = datetime.now(timezone.utc)
+        return await self.jobs.find_one_and_update(
+            {"type": job_type.name, "$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": job_type.max_attempts}},
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": worker_id,
+                    "started_at": now,
+                    "lease_until": now + timedelta(seconds=job_type.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fire_schedules(self):
+        """Enqueue every schedule that is due. The schedule document guards each run"""
+        schedules = self.db[SCHEDULES_COLLECTION]
+        now = datetime.now(timezone.utc)
+        for schedule in self.schedules.values():
+            # Registers the schedule on first sight; a changed expression restarts it from now
+            if not await schedules.find_one({"_id": schedule.name, "expression": schedule.cron.expression}, {"_id": 1}):
+                await schedules.update_one(
+                    {"_id": schedule.name},
+                    {"$set": {"expression": schedule.cron.expression, "next_run_at": schedule.cron.next_after(now)}},
+                    upsert=True,
+                )
+            due = await schedules.find_one_and_update(
+                {"_id": schedule.name, "next_run_at": {"$lte": now}},
+                {"$set": {"next_run_at": schedule.cron.next_after(now)}},
+            )
+            if due:
+                run_key = _utc(due["next_run_at"]).strftime("%Y-%m-%dT%H:%M")
+                await self.enqueue(schedule.job_type, schedule.payload, unique_key=f"{schedule.name}:{run_key}")
+
+    async def depth(self) -> Dict[str, Dict]:
+        """Job counts per type and status, plus how overdue the oldest due job is"""
+        now = datetime.now(timezone.utc)
+        report: Dict[str, Dict] = {name: {"oldest_due_seconds": 0} for name in self.types}
+        async for row in self.jobs.aggregate([
+            {"$group": {"_id": {"type": "$type", "status": "$status"}, "count": {"$sum": 1}}},
+        ]):
+            report.setdefault(row["_id"]["type"], {"oldest_due_seconds": 0})[row["_id"]["status"]] = row["count"]
+        async for row in self.jobs.aggregate([
+            {"$match": {"status": "queued", "run_at": {"$lte": now}}},
+            {"$group": {"_id": "$type", "oldest": {"$min": "$run_at"}}},
+        ]):
+            report.setdefault(row["_id"], {})["oldest_due_seconds"] = (now - _utc(row["oldest"])).total_seconds()
+        return report
+
+
+class JobWorker:
+    """Runs jobs from a JobQueue, with at most `concurrency` jobs of each type at once in this process"""
+
+    def __init__(self, queue: JobQueue, worker_id: Optional[str] = None, poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval or float(os.environ.get("JOB_POLL_SECONDS", "1"))
+        self.running: Dict[str, Set[asyncio.Task]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._depth_refreshed = 0.0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [task for tasks in self.running.values() for task in tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(self._task, *tasks, return_exceptions=True)
+        self._task = None
+        # Hand unfinished jobs straight back instead of waiting for their leases to run out
+        await self.queue.jobs.update_many(
+            {"worker": self.worker_id, "status": "running"},
+            {"$set": {"status": "queued", "run_at": datetime.now(timezone.utc)}, "$inc": {"attempts": -1}},
+        )
+
+    async def run(self):
+        while True:
+            try:
+                await self.queue.fire_schedules()
+                await self._claim_available()
+                if time.monotonic() - self._depth_refreshed > DEPTH_REFRESH_SECONDS:
+                    await self._refresh_depth()
+            except PyMongoError as e:
+                logger.warning(f"Job worker poll failed: {e}")
+            except Exception:
+                # Anything else would end the task silently and stop all jobs in this process
+                logger.exception("Job worker poll failed")
+            try:
+                await asyncio.wait_for(self.queue.enqueued.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.queue.enqueued.clear()
+
+    async def _claim_available(self):
+        for job_type in self.queue.types.values():
+            await self.queue.fail_abandoned(job_type)
+            running = self.running.setdefault(job_type.name, set())
+            while len(running) < job_type.concurrency:
+                job = await self.queue.claim(job_type, self.worker_id)
+                if job is None:
+                    break
+                task = asyncio.create_task(self._execute(job_type, job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+    async def _refresh_depth(self):
+        for job_type, counts in (await self.queue.depth()).items():
+            for status in ("queued", "running", "done", "failed"):
+                JOB_QUEUE_DEPTH.set(counts.get(status, 0), type=job_type, status=status)
+            JOB_QUEUE_OLDEST_DUE.set(counts["oldest_due_seconds"], type=job_type)
+        self._depth_refreshed = time.monotonic()
+
+    async def _heartbeat(self, job_type: JobType, job_id: str):
+        while True:
+            await asyncio.sleep(job_type.lease_seconds / 3)
+            try:
+                await self.queue.jobs.update_one(
+                    {"_id": job_id, "worker": self.worker_id, "status": "running"},
+                    {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=job_type.lease_seconds)}},
+                )
+            except PyMongoError as e:
+                logger.warning(f"Could not extend lease on job {job_id}: {e}")
+
+    async def _execute(self, job_type: JobType, job: Dict):
+        JOB_WAIT.observe(max(0.0, (datetime.now(timezone.utc) - _utc(job["run_at"])).total_seconds()), type=job_type.name)
+        heartbeat = asyncio.create_task(self._heartbeat(job_type, job["_id"]))
+        start = time.perf_counter()
+        try:
+            await job_type.handler(job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._failed(job_type, job, e)
+            outcome = "error"
+        else:
+            now = datetime.now(timezone.utc)
+            await self.queue.jobs.update_one(
+                {"_id": job["_id"], "worker": self.worker_id},
+                {"$set": {"status": "done", "finished_at": now, "expire_at": now + DONE_RETENTION},
+                 "$unset": {"lease_until": ""}},
+            )
+            outcome = "success"
+        finally:
+            heartbeat.cancel()
+        JOB_RUNS.inc(type=job_type.name, outcome=outcome)
+        JOB_DURATION.observe(time.perf_counter() - start, type=job_type.name, outcome=outcome)
+        # A finished slot may let the next job of this type start right away
+        self.queue.enqueued.set()
+
+    async def _failed(self, job_type: JobType, job: Dict, error: Exception):
+        now = datetime.now(timezone.utc)
+        update = {"last_error": "".join(traceback.format_exception_only(type(error), error)).strip()}
+        if job["attempts"] >= job_type.max_attempts:
+            logger.error(f"Job {job['_id']} ({job_type.name}) failed after {job['attempts']} attempts: {error}")
+            update.update(status="failed", finished_at=now, expire_at=now + FAILED_RETENTION)
+        else:
+            delay = min(job_type.backoff_seconds * 2 ** (job["attempts"] - 1), MAX_BACKOFF_SECONDS)
+            logger.warning(f"Job {job['_id']} ({job_type.name}) failed, retrying in {delay}s: {error}")
+            update.update(status="queued", run_at=now + timedelta(seconds=delay))
+        await self.queue.jobs.update_one(
+            {"_id": job["_id"], "worker": self.worker_id},
+            {"$set": update, "$unset": {"lease_until": ""}},
+        )
@@ -0,0 +1,276 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, tuple(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # One slot per bucket plus +Inf, then the running sum
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            labels = tuple(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                samples.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), count))
+            samples.append((f"{self.name}_count", labels, state[len(self.buckets)]))
+            samples.append((f"{self.name}_sum", labels, state[-1]))
+        return samples
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",)
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size by route", ("method", "route"), buckets=SIZE_BUCKETS
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection", "outcome")
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool", ("address",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts by reason", ("address", "reason")
+)
+MONGO_POOL_CONNECTIONS_IN_USE = Gauge("mongo_pool_connections_in_use", "Connections checked out", ("address",))
+MONGO_POOL_CONNECTIONS_OPEN = Gauge("mongo_pool_connections_open", "Open pooled connections", ("address",))
+MONGO_POOL_CLEARED = Counter("mongo_pool_cleared_total", "Times a connection pool was cleared", ("address",))
+EMAIL_SENDS = Counter("email_sends_total", "Transactional emails by template and outcome", ("template", "status"))
+STRIPE_CALLS = Counter("stripe_calls_total", "Stripe API calls by operation and outcome", ("operation", "status"))
+STRIPE_CALL_DURATION = Histogram("stripe_call_duration_seconds", "Stripe API call latency", ("operation",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and response size per route.
+
+    Routes are labelled by their path template (e.g. /api/orders/{order_id}) so the
+    label set stays bounded; requests that match no route are grouped as "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status_code = 500
+        size = 0
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            # The router stores the matched route in the scope it was handed
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=method, route=route_label, status=str(status_code)
+            )
+            HTTP_RESPONSE_SIZE.observe(size, method=method, route=route_label)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_COMMAND_DURATION"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _pop_collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name, collection=self._pop_collection(event), outcome="success"
+        )
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name, collection=self._pop_collection(event), outcome="failure"
+        )
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """pymongo pool listener tracking checkout waits, in-use and open connections"""
+
+    def __init__(self):
+        self._checkout_started: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _wait_started(self, event) -> Optional[float]:
+        # Checkouts run synchronously on one driver thread, so the thread pairs start with finish
+        with self._lock:
+            return self._checkout_started.pop((event.address, threading.get_ident()), None)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._checkout_started[(event.address, threading.get_ident())] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = self._wait_started(event)
+        address = self._address(event)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, address=address)
+        MONGO_POOL_CONNECTIONS_IN_USE.inc(address=address)
+
+    def connection_check_out_failed(self, event):
+        self._wait_started(event)
+        MONGO_POOL_CHECKOUT_FAILURES.inc(address=self._address(event), reason=str(event.reason))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS_IN_USE.dec(address=self._address(event))
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS_OPEN.inc(address=self._address(event))
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS_OPEN.dec(address=self._address(event))
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.inc(address=self._address(event))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
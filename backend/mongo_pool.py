@@ -0,0 +1,82 @@
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Dict, List
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, SecondaryPreferred
+
+logger = logging.getLogger(__name__)
+
+# Python packages pymongo needs for each wire compressor
+_COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def available_compressors(requested: str) -> List[str]:
+    """Keep only the requested compressors whose Python package is installed"""
+    compressors = []
+    for name in (part.strip() for part in requested.split(",") if part.strip()):
+        if name not in _COMPRESSOR_PACKAGES:
+            logger.warning(f"Unknown Mongo compressor {name!r} ignored")
+            continue
+        package = _COMPRESSOR_PACKAGES[name]
+        if package and importlib.util.find_spec(package) is None:
+            logger.warning(f"Mongo compressor {name!r} needs the {package!r} package; skipping it")
+            continue
+        compressors.append(name)
+    return compressors
+
+
+def mongo_client_options() -> Dict:
+    """AsyncIOMotorClient keyword arguments, each overridable through MONGO_* env vars.
+
+    Sizes are per process: with several uvicorn workers the server sees
+    workers x MONGO_MAX_POOL_SIZE connections at most.
+    """
+    options = {
+        "appname": os.environ.get("MONGO_APP_NAME", "laundry-express-api"),
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 5),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS", 300_000),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5_000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5_000),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5_000),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS", 30_000),
+    }
+    compressors = available_compressors(os.environ.get("MONGO_COMPRESSORS", "zstd,zlib"))
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def catalog_read_preference():
+    """Read preference for read-mostly catalog and coverage data.
+
+    Defaults to secondaryPreferred with bounded staleness so catalog traffic
+    leaves primary capacity for checkout writes. Order and account reads keep
+    the client default (primary) so customers always see their own writes.
+    """
+    mode = os.environ.get("MONGO_CATALOG_READ_PREFERENCE", "secondaryPreferred")
+    # The driver requires at least 90 seconds when a staleness bound is set
+    max_staleness = _int_env("MONGO_CATALOG_MAX_STALENESS_SECONDS", 90)
+    if mode == "primary":
+        return Primary()
+    modes = {"primaryPreferred": PrimaryPreferred, "secondaryPreferred": SecondaryPreferred, "nearest": Nearest}
+    if mode not in modes:
+        raise ValueError(f"Unsupported MONGO_CATALOG_READ_PREFERENCE: {mode}")
+    return modes[mode](max_staleness=max_staleness)
+
+
+async def warm_up(db, connections: int):
+    """Open `connections` pooled connections before the first request needs them"""
+    try:
+        await asyncio.gather(*(db.command("ping") for _ in range(max(connections, 1))))
+        logger.info(f"Mongo connection pool warmed up with {connections} connections")
+    except Exception as e:
+        # Startup should not fail on a slow primary; requests will retry selection
+        logger.warning(f"Mongo connection warm-up failed: {e}")
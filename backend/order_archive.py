@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import calendar
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_STATUSES = ("completed", "cancelled")
+INDEX_COLLECTION = "archived_orders"
+# Orders per zstd frame: a lookup decompresses one frame, so this bounds its cost
+FRAME_SIZE = 500
+COMPRESSION_LEVEL = 10
+# Kept on the index entry so stats and listings can count archived orders without reading files
+INDEX_FIELDS = ("id", "order_number", "user_id", "business_id", "status", "total_amount", "created_at")
+DEFAULT_ARCHIVE_DIR = Path(__file__).parent / "archive" / "orders"
+
+
+@lru_cache(maxsize=1)
+def get_zstd():
+    import zstandard
+    return zstandard
+
+
+def months_ago(now: datetime, months: int) -> datetime:
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    # Clamp the day so e.g. 31 March minus one month lands on the last day of February
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+class ArchiveUnavailable(Exception):
+    pass
+
+
+class OrderArchive:
+    """Cold storage for finished orders.
+
+    Orders are appended to one file per creation month (`YYYY-MM.ndjson.zst`) as
+    independent zstd frames of up to FRAME_SIZE NDJSON lines. The
+    `archived_orders` collection is the index: one small entry per order with the
+    file, byte offset and length of its frame, so a lookup reads and decompresses a
+    single frame.
+    """
+
+    def __init__(self, db, directory: Optional[str] = None):
+        self.db = db
+        self.directory = Path(directory or os.environ.get("ORDER_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR)
+
+    @property
+    def index(self):
+        return self.db[INDEX_COLLECTION]
+
+    def _append_frame(self, month: str, orders: List[Dict]) -> Tuple[str, int, int]:
+        data = "".join(json.dumps(order, separators=(",", ":"), default=str) + "\n" for order in orders).encode()
+        frame = get_zstd().ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        filename = f"{month}.ndjson.zst"
+        with open(self.directory / filename, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(frame)
+            f.flush()
+            # The originals are deleted next, so the frame must be on disk first
+            os.fsync(f.fileno())
+        return filename, offset, len(frame)
+
+    def _read_frame(self, filename: str, offset: int, length: int) -> bytes:
+        with open(self.directory / filename, "rb") as f:
+            f.seek(offset)
+            return get_zstd().ZstdDecompressor().decompress(f.read(length))
+
+    async def _flush(self, month: str, orders: List[Dict], report: Dict):
+        filename, offset, length = await asyncio.to_thread(self._append_frame, month, orders)
+        now = datetime.now(timezone.utc).isoformat()
+        await self.index.bulk_write([
+            UpdateOne(
+                {"id": order["id"]},
+                {"$set": {
+                    **{field: order.get(field) for field in INDEX_FIELDS},
+                    "file": filename, "offset": offset, "length": length, "archived_at": now,
+                }},
+                upsert=True,
+            )
+            for order in orders
+        ], ordered=False)
+        result = await self.db.orders.delete_many({"id": {"$in": [order["id"] for order in orders]}})
+        report["archived"] += result.deleted_count
+        report["bytes"] += length
+        report["files"].add(filename)
+
+    async def archive(self, older_than_months: int, statuses=ARCHIVE_STATUSES, dry_run: bool = False) -> Dict:
+        """Move orders in `statuses` created more than `older_than_months` months ago into the archive"""
+        cutoff = months_ago(datetime.now(timezone.utc), older_than_months).isoformat()
+        query = {"status": {"$in": list(statuses)}, "created_at": {"$lt": cutoff}}
+        report = {"cutoff": cutoff, "archived": 0, "bytes": 0, "files": set()}
+        if dry_run:
+            report["matched"] = await self.db.orders.count_documents(query)
+            report["files"] = []
+            return report
+
+        pending: Dict[str, List[Dict]] = {}
+        cursor = self.db.orders.find(query, {"_id": 0}).sort("created_at", 1).batch_size(FRAME_SIZE)
+        async for order in cursor:
+            month = order["created_at"][:7]
+            batch = pending.setdefault(month, [])
+            batch.append(order)
+            if len(batch) >= FRAME_SIZE:
+                await self._flush(month, pending.pop(month), report)
+        for month, batch in pending.items():
+            await self._flush(month, batch, report)
+        report["files"] = sorted(report["files"])
+        return report
+
+    async def find(self, order_id: str) -> Optional[Dict]:
+        entry = await self.index.find_one({"id": order_id}, {"_id": 0, "file": 1, "offset": 1, "length": 1})
+        if entry is None:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_frame, entry["file"], entry["offset"], entry["length"])
+        except FileNotFoundError:
+            raise ArchiveUnavailable(f"Archive file {entry['file']} is not available in {self.directory}")
+        for line in data.splitlines():
+            order = json.loads(line)
+            if order["id"] == order_id:
+                return order
+        logger.error(f"Archived order {order_id} missing from {entry['file']} at offset {entry['offset']}")
+        return None
+
+    async def totals(self, query: Dict) -> Tuple[int, float]:
+        """Count and revenue of archived orders matching `query`, read from the index alone"""
+        result = await self.index.aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "total": {"$sum": "$total_amount"}}},
+        ]).to_list(1)
+        return (result[0]["count"], result[0]["total"]) if result else (0, 0)
+
+
+async def _main(args):
+    from server import client, db
+
+    try:
+        report = await OrderArchive(db, args.directory).archive(args.months, args.status, dry_run=args.dry_run)
+    finally:
+        client.close()
+
+    print(f"Cutoff: orders created before {report['cutoff']}")
+    if args.dry_run:
+        print(f"Would archive: {report['matched']}")
+        return
+    print(f"Archived: {report['archived']} ({report['bytes'] / 1024:.1f} KiB compressed)")
+    for filename in report["files"]:
+        print(f"  {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old finished orders into compressed monthly archive files")
+    parser.add_argument("--months", type=int, default=12, help="Archive orders created more than this many months ago")
+    parser.add_argument("--status", nargs="+", default=list(ARCHIVE_STATUSES), help="Order statuses to archive")
+    parser.add_argument("--directory", help="Archive directory (default ORDER_ARCHIVE_DIR or backend/archive/orders)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the orders that would be archived")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterable, List
+
+ORDER_COLUMNS = [
+    "id", "order_number", "created_at", "status", "payment_method", "payment_status",
+    "user_id", "user_name", "user_email", "address", "pin_code",
+    "pickup_date", "pickup_time", "delivery_date", "delivery_time", "total_amount",
+]
+ITEM_COLUMNS = [
+    "product_id", "product_name", "business_id", "business_name",
+    "category", "subcategory", "price", "quantity",
+]
+EXPORT_COLUMNS = ORDER_COLUMNS + ["item_" + column for column in ITEM_COLUMNS]
+
+# Only the fields that end up in an export row are read from Mongo;
+# business_id lets slim line items be hydrated with the business name
+EXPORT_PROJECTION = {"_id": 0, "items": 1, "business_id": 1, **{column: 1 for column in ORDER_COLUMNS}}
+
+ROWS_PER_CHUNK = 500
+
+
+def flatten_order(order: Dict) -> Iterable[Dict]:
+    """Yield one export row per line item, repeating the order columns"""
+    base = {column: order.get(column) for column in ORDER_COLUMNS}
+    items = order.get("items") or [{}]
+    for item in items:
+        row = dict(base)
+        for column in ITEM_COLUMNS:
+            row["item_" + column] = item.get(column)
+        yield row
+
+
+async def stream_csv(cursor) -> AsyncIterator[str]:
+    """Stream orders from a Motor cursor as CSV, flushing every ROWS_PER_CHUNK rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    async for order in cursor:
+        for row in flatten_order(order):
+            writer.writerow(row)
+            rows += 1
+        if rows >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+async def stream_ndjson(cursor) -> AsyncIterator[str]:
+    """Stream orders from a Motor cursor as newline-delimited JSON rows"""
+    lines: List[str] = []
+    async for order in cursor:
+        for row in flatten_order(order):
+            lines.append(json.dumps(row, default=str))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from order_archive import INDEX_COLLECTION as ARCHIVE_INDEX, OrderArchive
+from order_views import SUMMARY_PROJECTION, order_summary_pipeline
+
+HISTORY_COLLECTION = "order_history"
+RECENT_ORDERS = 10
+MAX_ACTIVE_ORDERS = 50
+FINISHED_STATUSES = ("completed", "cancelled")
+# What the customer dashboard shows for each order
+HISTORY_FIELDS = (
+    "id", "order_number", "status", "total_amount", "item_count", "created_at",
+    "pickup_date", "pickup_time", "delivery_date", "delivery_time",
+)
+HISTORY_PROJECTION = {
+    "_id": 0,
+    **{field: 1 for field in HISTORY_FIELDS},
+    "item_count": SUMMARY_PROJECTION["item_count"],
+}
+
+
+def history_entry(order: Dict) -> Dict:
+    return {field: order.get(field) for field in HISTORY_FIELDS}
+
+
+def _spend(status: str, amount: float) -> float:
+    # Cancelled orders stay in the count but not in lifetime spend
+    return 0 if status == "cancelled" else amount
+
+
+async def record_order(db, order: Dict):
+    """Add a newly placed order to its customer's history"""
+    entry = history_entry(order)
+    # No upsert: a customer without a history document gets one built from their orders on first read
+    await db[HISTORY_COLLECTION].update_one(
+        {"_id": order["user_id"]},
+        {
+            "$inc": {"order_count": 1, "lifetime_spend": _spend(order["status"], order["total_amount"])},
+            "$push": {
+                "recent": {"$each": [entry], "$position": 0, "$slice": RECENT_ORDERS},
+                "active": {"$each": [entry], "$position": 0, "$slice": MAX_ACTIVE_ORDERS},
+            },
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()},
+        },
+    )
+
+
+async def record_status_change(db, order: Dict, old_status: str, new_status: str):
+    """Reflect an order's status change in its customer's history, in one pipeline update"""
+    def with_status(array: str):
+        return {"$map": {"input": array, "as": "entry", "in": {"$cond": [
+            {"$eq": ["$$entry.id", order["id"]]},
+            {**{field: f"$$entry.{field}" for field in HISTORY_FIELDS}, "status": {"$literal": new_status}},
+            "$$entry",
+        ]}}}
+
+    if new_status in FINISHED_STATUSES:
+        active = {"$filter": {"input": "$active", "as": "entry", "cond": {"$ne": ["$$entry.id", order["id"]]}}}
+    elif old_status in FINISHED_STATUSES:
+        # A finished order was reopened
+        entry = {**history_entry(order), "status": new_status}
+        active = {"$concatArrays": [{"$literal": [entry]}, "$active"]}
+    else:
+        active = with_status("$active")
+    spend_change = _spend(new_status, order["total_amount"]) - _spend(old_status, order["total_amount"])
+    await db[HISTORY_COLLECTION].update_one({"_id": order["user_id"]}, [{"$set": {
+        "recent": with_status("$recent"),
+        "active": active,
+        "lifetime_spend": {"$add": ["$lifetime_spend", spend_change]},
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }}])
+
+
+async def build_history(db, user_id: str) -> Dict:
+    """Compute a customer's history from their orders, including archived ones"""
+    totals = await db.orders.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "spend": {"$sum": {"$cond": [{"$eq": ["$status", "cancelled"]}, 0, "$total_amount"]}},
+        }},
+    ]).to_list(1)
+    count, spend = (totals[0]["count"], totals[0]["spend"]) if totals else (0, 0)
+    archive = OrderArchive(db)
+    archived_count, _ = await archive.totals({"user_id": user_id})
+    _, archived_spend = await archive.totals({"user_id": user_id, "status": {"$ne": "cancelled"}})
+    recent = await db.orders.aggregate(
+        order_summary_pipeline({"user_id": user_id}, RECENT_ORDERS, HISTORY_PROJECTION)
+    ).to_list(RECENT_ORDERS)
+    active = await db.orders.aggregate(order_summary_pipeline(
+        {"user_id": user_id, "status": {"$nin": list(FINISHED_STATUSES)}}, MAX_ACTIVE_ORDERS, HISTORY_PROJECTION
+    )).to_list(MAX_ACTIVE_ORDERS)
+    return {
+        "_id": user_id,
+        "order_count": count + archived_count,
+        "lifetime_spend": spend + archived_spend,
+        "recent": recent,
+        "active": active,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def get_history(db, user_id: str) -> Dict:
+    """A customer's history document: one point read once it exists"""
+    history: Optional[Dict] = await db[HISTORY_COLLECTION].find_one({"_id": user_id})
+    if history is None:
+        history = await build_history(db, user_id)
+        try:
+            await db[HISTORY_COLLECTION].insert_one(history)
+        except DuplicateKeyError:
+            history = await db[HISTORY_COLLECTION].find_one({"_id": user_id})
+    history.pop("_id")
+    history["lifetime_spend"] = round(history["lifetime_spend"], 2)
+    return history
+
+
+async def rebuild_all(db) -> int:
+    """Recompute every customer's history from scratch, e.g. after orders were changed by hand"""
+    user_ids = set(await db.orders.distinct("user_id")) | set(await db[ARCHIVE_INDEX].distinct("user_id"))
+    for user_id in user_ids:
+        history = await build_history(db, user_id)
+        await db[HISTORY_COLLECTION].replace_one({"_id": user_id}, history, upsert=True)
+    return len(user_ids)
+
+
+async def _main():
+    from server import client, db
+
+    try:
+        print(f"Rebuilt order history for {await rebuild_all(db)} customers")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,114 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+from business_cache import business_names
+from tenancy import MIXED_BUSINESS_ORDER, SINGLE_BUSINESS_ORDER
+
+# Stored line items keep the product reference and what the customer paid; catalog
+# strings (category, business name) are looked up again when an order is opened.
+LINE_ITEM_FIELDS = ("product_id", "product_name", "price", "quantity")
+HYDRATED_PRODUCT_FIELDS = ("category", "subcategory")
+
+SUMMARY_FIELDS = (
+    "id", "order_number", "status", "payment_status", "total_amount", "business_id", "user_name", "user_email",
+    "created_at", "pickup_date", "pickup_time", "delivery_date", "delivery_time",
+)
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    **{field: 1 for field in SUMMARY_FIELDS},
+    # Orders from before item_count was stored fall back to counting server-side
+    "item_count": {"$ifNull": ["$item_count", {"$sum": "$items.quantity"}]},
+}
+
+
+def slim_line_item(item: Dict) -> Dict:
+    return {field: item.get(field) for field in LINE_ITEM_FIELDS}
+
+
+def order_summary_pipeline(query: Dict, limit: int, project: Dict = SUMMARY_PROJECTION) -> List[Dict]:
+    """List view of orders: items never leave the database, only their count"""
+    return [
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$project": project},
+    ]
+
+
+async def hydrate_orders(db, orders: List[Dict]) -> List[Dict]:
+    """Fill catalog details back into slim line items, with one products query for the whole batch"""
+    missing = {
+        item["product_id"]
+        for order in orders for item in order.get("items", [])
+        if "category" not in item and item.get("product_id")
+    }
+    products = {}
+    if missing:
+        async for product in db.products.find(
+            {"id": {"$in": list(missing)}}, {"_id": 0, "id": 1, **{field: 1 for field in HYDRATED_PRODUCT_FIELDS}}
+        ):
+            products[product["id"]] = product
+    for order in orders:
+        for item in order.get("items", []):
+            if "category" not in item:
+                # Products deleted since the order was placed leave these empty
+                product = products.get(item.get("product_id"), {})
+                for field in HYDRATED_PRODUCT_FIELDS:
+                    item[field] = product.get(field)
+            # Items of older mixed-business orders keep their own business
+            business_id = item.get("business_id") or order.get("business_id")
+            if "business_name" not in item and business_id:
+                item["business_id"] = business_id
+                item["business_name"] = await business_names.get_name(db, business_id)
+    return orders
+
+
+async def hydrated_batches(db, cursor, batch_size: int = 500) -> AsyncIterator[Dict]:
+    """Re-yield orders from `cursor` with line items hydrated a batch at a time"""
+    batch = []
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            for hydrated in await hydrate_orders(db, batch):
+                yield hydrated
+            batch = []
+    for hydrated in await hydrate_orders(db, batch):
+        yield hydrated
+
+
+def _slim_items(fields) -> Dict:
+    return {"$map": {"input": "$items", "as": "item", "in": {field: f"$$item.{field}" for field in fields}}}
+
+
+async def slim_stored_orders(db) -> int:
+    """Rewrite orders placed before line items were slimmed, in two server-side updates"""
+    single = await db.orders.update_many(
+        {"items.category": {"$exists": True}, **SINGLE_BUSINESS_ORDER},
+        [{"$set": {
+            "business_id": {"$ifNull": ["$business_id", {"$arrayElemAt": ["$items.business_id", 0]}]},
+            "item_count": {"$sum": "$items.quantity"},
+            "items": _slim_items(LINE_ITEM_FIELDS),
+        }}],
+    )
+    # No single business to move up to the order, so each item keeps its own
+    mixed = await db.orders.update_many(
+        {"items.category": {"$exists": True}, **MIXED_BUSINESS_ORDER},
+        [{"$set": {
+            "item_count": {"$sum": "$items.quantity"},
+            "items": _slim_items((*LINE_ITEM_FIELDS, "business_id")),
+        }}],
+    )
+    return single.modified_count + mixed.modified_count
+
+
+async def _main():
+    from server import client, db
+
+    try:
+        print(f"Slimmed {await slim_stored_orders(db)} orders")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,46 @@
+from typing import Dict, List, Optional
+
+
+def adjusted_price_expression(mode: str, amount: float, endings: Optional[List[float]] = None) -> Dict:
+    """Build the aggregation expression for an adjusted `$price`.
+
+    `mode` is "percent" (amount is a percentage, e.g. 5 for +5%) or "absolute"
+    (amount in pounds). With `endings` such as [0.45, 0.95] the result is rounded
+    up to the next price ending in one of them; otherwise it is rounded to pence.
+    The same expression drives both the update pipeline and the dry-run preview.
+    """
+    if mode == "percent":
+        raw = {"$multiply": ["$price", 1 + amount / 100]}
+    else:
+        raw = {"$add": ["$price", amount]}
+    price = {"$round": [{"$max": [raw, 0]}, 2]}
+    if not endings:
+        return price
+
+    endings = sorted(endings)
+    base = {"$floor": "$$price"}
+    branches = [
+        # Half-penny tolerance so prices already on an ending are not bumped by float error
+        {"case": {"$lte": ["$$price", {"$add": [base, ending + 0.005]}]}, "then": {"$add": [base, ending]}}
+        for ending in endings
+    ]
+    return {
+        "$let": {
+            "vars": {"price": price},
+            "in": {
+                "$round": [
+                    {"$switch": {"branches": branches, "default": {"$add": [base, 1 + endings[0]]}}},
+                    2
+                ]
+            }
+        }
+    }
+
+
+def catalog_filter(business_id: str, category: Optional[str] = None, subcategory: Optional[str] = None) -> Dict:
+    query = {"business_id": business_id}
+    if category:
+        query["category"] = category
+    if subcategory:
+        query["subcategory"] = subcategory
+    return query
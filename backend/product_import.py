@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import csv
+import io
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, TextIO, Type
+
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+OPTIONAL_FIELDS = ("subcategory", "icon_url", "sort_order")
+
+
+def iter_csv_rows(stream: TextIO) -> Iterable[Dict]:
+    """Parse a CSV stream row by row without loading the whole file"""
+    for row in csv.DictReader(stream):
+        cleaned = {key.strip(): (value.strip() if isinstance(value, str) else value)
+                   for key, value in row.items() if key}
+        # Blank cells mean "not set" for the optional product fields
+        for field in OPTIONAL_FIELDS:
+            if cleaned.get(field) == "":
+                cleaned[field] = None
+        yield cleaned
+
+
+async def _resolve_business_names(db, business_ids: Iterable[str], names: Dict[str, Optional[str]]):
+    missing = [business_id for business_id in set(business_ids) if business_id not in names]
+    if not missing:
+        return
+    found = await db.businesses.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    for business in found:
+        names[business["id"]] = business["name"]
+    for business_id in missing:
+        names.setdefault(business_id, None)
+
+
+async def _flush(db, chunk: List[Dict], names: Dict[str, Optional[str]], report: Dict):
+    await _resolve_business_names(db, (product.business_id for _, product in chunk), names)
+    now = datetime.now(timezone.utc).isoformat()
+    operations = []
+    for line, product in chunk:
+        business_name = names.get(product.business_id)
+        if business_name is None:
+            _record_error(report, line, f"Business not found: {product.business_id}")
+            continue
+        key = {
+            "business_id": product.business_id,
+            "category": product.category,
+            "subcategory": product.subcategory,
+            "name": product.name,
+        }
+        fields = {
+            "business_name": business_name,
+            "service_type": product.service_type,
+            "price": product.price,
+            "icon_url": product.icon_url,
+        }
+        on_insert = {"id": str(uuid.uuid4()), "created_at": now}
+        if product.sort_order is not None:
+            fields["sort_order"] = product.sort_order
+        else:
+            on_insert["sort_order"] = line
+        operations.append(UpdateOne(key, {"$set": fields, "$setOnInsert": on_insert}, upsert=True))
+    if not operations:
+        return
+    result = await db.products.bulk_write(operations, ordered=False)
+    report["inserted"] += result.upserted_count
+    report["updated"] += result.modified_count
+    # Matched documents whose $set changed nothing are left untouched by Mongo
+    report["unchanged"] += result.matched_count - result.modified_count
+
+
+def _record_error(report: Dict, line: int, message: str):
+    report["skipped"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "error": message})
+
+
+async def import_products(
+    db,
+    rows: Iterable[Dict],
+    model: Type[BaseModel],
+    business_id: Optional[str] = None,
+    service_type: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    allowed_business_ids: Optional[List[str]] = None,
+) -> Dict:
+    """Validate rows against `model` and upsert them on (business_id, category, subcategory, name).
+
+    Only the products collection is written, in chunks of `chunk_size` unordered bulk writes.
+    Rows for businesses outside `allowed_business_ids` (when given) are skipped.
+    """
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": []}
+    names: Dict[str, Optional[str]] = {}
+    chunk = []
+    # Line 1 is the CSV header
+    for line, row in enumerate(rows, start=2):
+        if business_id and not row.get("business_id"):
+            row["business_id"] = business_id
+        if service_type and not row.get("service_type"):
+            row["service_type"] = service_type
+        try:
+            product = model.model_validate(row)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            _record_error(report, line, errors)
+            continue
+        if allowed_business_ids is not None and product.business_id not in allowed_business_ids:
+            _record_error(report, line, f"Not allowed to import into business {product.business_id}")
+            continue
+        chunk.append((line, product))
+        if len(chunk) >= chunk_size:
+            await _flush(db, chunk, names, report)
+            chunk = []
+    if chunk:
+        await _flush(db, chunk, names, report)
+    return report
+
+
+async def _main(args):
+    from cache_bus import bump_version
+    from server import ProductCreate, client, db
+
+    try:
+        with io.open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = await import_products(
+                db,
+                iter_csv_rows(stream),
+                ProductCreate,
+                business_id=args.business_id,
+                service_type=args.service_type,
+            )
+        # Running API workers reload their catalog caches on the next version poll
+        if report["inserted"] or report["updated"]:
+            await bump_version(db, "products")
+    finally:
+        client.close()
+
+    print(f"Inserted: {report['inserted']}")
+    print(f"Updated: {report['updated']}")
+    print(f"Unchanged: {report['unchanged']}")
+    print(f"Skipped: {report['skipped']}")
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import products from a CSV file")
+    parser.add_argument("path", help="CSV file with business_id, service_type, category, subcategory, name, price columns")
+    parser.add_argument("--business-id", help="Business to use for rows without a business_id")
+    parser.add_argument("--service-type", help="Service type to use for rows without a service_type")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,258 @@
+import asyncio
+import heapq
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SEARCH_FIELDS = (("name", 3.0), ("subcategory", 2.0), ("category", 1.0))
+RESULT_FIELDS = (
+    "id", "business_id", "business_name", "service_type", "category", "subcategory", "name", "price", "icon_url",
+)
+RESULT_PROJECTION = {"_id": 0, **{field: 1 for field in RESULT_FIELDS}}
+
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+# Shorter words have too many one-edit neighbours for typo matches to be useful
+MIN_FUZZY_LENGTH = 4
+# A one-letter prefix can match most of the vocabulary; only the closest words are expanded
+MAX_PREFIX_EXPANSIONS = 64
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _deletes(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or transposition"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class ProductSearchIndex:
+    """Inverted index over product name, category and subcategory.
+
+    Businesses list the same items, so products with identical searchable text
+    share one entry and queries score entries rather than every product. Each
+    word maps to the entries containing it, weighted by field. Prefix matches
+    come from a sorted vocabulary and one-typo matches from a symmetric-delete
+    map. Products are added and removed one at a time as they change; full
+    rebuilds are indexed in a thread and swapped in whole.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._rebuild_waiting = False
+        # Products refreshed one at a time while a rebuild runs; None when no rebuild is running
+        self._changed_during_rebuild: Optional[Set[str]] = None
+        self._reset()
+
+    def _reset(self):
+        self._docs: Dict[str, Dict] = {}
+        self._doc_entry: Dict[str, Tuple] = {}
+        # entry key -> {product id: None}, kept in insertion order
+        self._entries: Dict[Tuple, Dict[str, None]] = {}
+        self._entry_tokens: Dict[Tuple, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[Tuple, float]] = {}
+        self._vocabulary: List[str] = []
+        self._deletes: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def load(self, products: Iterable[Dict]):
+        self._reset()
+        for product in products:
+            self.add(product)
+        self.loaded = True
+
+    @classmethod
+    def _built(cls, products: List[Dict]) -> "ProductSearchIndex":
+        index = cls()
+        index.load(products)
+        return index
+
+    async def _rebuild(self, collection):
+        """Re-index every product; the caller holds the lock"""
+        self._changed_during_rebuild = set()
+        try:
+            products = await collection.find({}, RESULT_PROJECTION).to_list(None)
+            # Indexing a large catalog takes long enough to stall every request on the event loop
+            built = await asyncio.to_thread(self._built, products)
+            for name in ("_docs", "_doc_entry", "_entries", "_entry_tokens", "_postings", "_vocabulary", "_deletes"):
+                setattr(self, name, getattr(built, name))
+            self.loaded = True
+        finally:
+            changed, self._changed_during_rebuild = self._changed_during_rebuild, None
+        # The swapped-in index may predate these; read them again
+        for product_id in changed:
+            await self._refresh_product(collection, product_id)
+
+    async def ensure_loaded(self, collection):
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self._rebuild(collection)
+
+    async def refresh(self, collection, product_id: Optional[str] = None):
+        """Re-read one product, or everything when `product_id` is None, after a write"""
+        if not self.loaded:
+            return
+        if product_id is not None:
+            await self._refresh_product(collection, product_id)
+            return
+        # A rebuild still waiting for the lock reads after this write landed, so it covers it too
+        if self._rebuild_waiting:
+            return
+        self._rebuild_waiting = True
+        async with self._lock:
+            self._rebuild_waiting = False
+            await self._rebuild(collection)
+
+    async def _refresh_product(self, collection, product_id: str):
+        if self._changed_during_rebuild is not None:
+            self._changed_during_rebuild.add(product_id)
+        product = await collection.find_one({"id": product_id}, RESULT_PROJECTION)
+        if product is None:
+            self.remove(product_id)
+        else:
+            self.add(product)
+
+    def refresh_later(self, collection, product_id: Optional[str] = None):
+        """Schedule `refresh` from synchronous code such as cache bus callbacks"""
+        task = asyncio.get_running_loop().create_task(self.refresh(collection, product_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def add(self, product: Dict):
+        product_id = product["id"]
+        if product_id in self._docs:
+            self.remove(product_id)
+        self._docs[product_id] = {field: product.get(field) for field in RESULT_FIELDS}
+        key = tuple((product.get(field) or "").lower() for field, _ in SEARCH_FIELDS)
+        self._doc_entry[product_id] = key
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[product_id] = None
+            return
+        self._entries[key] = {product_id: None}
+        weights: Dict[str, float] = {}
+        for text, (_, weight) in zip(key, SEARCH_FIELDS):
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        self._entry_tokens[key] = weights
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+                if len(token) >= MIN_FUZZY_LENGTH:
+                    for variant in _deletes(token) | {token}:
+                        self._deletes.setdefault(variant, set()).add(token)
+            postings[key] = weight
+
+    def remove(self, product_id: str):
+        if self._docs.pop(product_id, None) is None:
+            return
+        key = self._doc_entry.pop(product_id)
+        entry = self._entries[key]
+        del entry[product_id]
+        if entry:
+            return
+        del self._entries[key]
+        for token in self._entry_tokens.pop(key):
+            postings = self._postings[token]
+            del postings[key]
+            if postings:
+                continue
+            del self._postings[token]
+            del self._vocabulary[bisect_left(self._vocabulary, token)]
+            if len(token) >= MIN_FUZZY_LENGTH:
+                for variant in _deletes(token) | {token}:
+                    tokens = self._deletes[variant]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._deletes[variant]
+
+    def _expand(self, term: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Vocabulary words matching `term`, with how closely each matches"""
+        matches: Dict[str, float] = {}
+        if term in self._postings:
+            matches[term] = EXACT
+        if prefix:
+            start = bisect_left(self._vocabulary, term)
+            candidates = []
+            for token in self._vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    candidates.append(token)
+            for token in heapq.nsmallest(MAX_PREFIX_EXPANSIONS, candidates, key=len):
+                matches.setdefault(token, PREFIX)
+        if len(term) >= MIN_FUZZY_LENGTH and term not in matches:
+            candidates = set()
+            for variant in _deletes(term) | {term}:
+                candidates |= self._deletes.get(variant, set())
+            for token in candidates:
+                if token not in matches and _within_one_edit(term, token):
+                    matches[token] = FUZZY
+        return list(matches.items())
+
+    def search(self, query: str, limit: int = 10, business_ids: Optional[Set[str]] = None) -> List[Dict]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores: Optional[Dict[Tuple, float]] = None
+        for position, term in enumerate(terms):
+            # The last word is still being typed, so it also matches as a prefix
+            term_scores: Dict[Tuple, float] = {}
+            for token, quality in self._expand(term, prefix=position == len(terms) - 1):
+                for key, weight in self._postings[token].items():
+                    score = quality * weight
+                    if score > term_scores.get(key, 0.0):
+                        term_scores[key] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                if len(term_scores) < len(scores):
+                    scores, term_scores = term_scores, scores
+                scores = {key: score + term_scores[key] for key, score in scores.items() if key in term_scores}
+            if not scores:
+                return []
+
+        # Best score first, then alphabetical by name (the first part of the entry key)
+        ranked = [(-score, key) for key, score in scores.items()]
+        ordered = heapq.nsmallest(limit, ranked) if business_ids is None else sorted(ranked)
+        results = []
+        for _, key in ordered:
+            for product_id in self._entries[key]:
+                doc = self._docs[product_id]
+                if business_ids is None or doc["business_id"] in business_ids:
+                    results.append(doc)
+                    if len(results) >= limit:
+                        return results
+        return results
+
+
+search_index = ProductSearchIndex()
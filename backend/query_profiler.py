@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from indexes import ensure_indexes
+
+logger = logging.getLogger("slow_queries")
+
+SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", "100"))
+RECENT_SLOW_QUERIES = 200
+
+# Commands whose filter we know how to extract, and where it lives
+_FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with "?" so filters group by structure, not data"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return "?"
+    return "?"
+
+
+def command_filter(command_name: str, command: Dict) -> Optional[Dict]:
+    if command_name in _FILTER_FIELDS:
+        return command.get(_FILTER_FIELDS[command_name])
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        if pipeline and "$match" in pipeline[0]:
+            return pipeline[0]["$match"]
+        return None
+    if command_name == "update":
+        updates = command.get("updates") or []
+        return updates[0].get("q") if updates else None
+    if command_name == "delete":
+        deletes = command.get("deletes") or []
+        return deletes[0].get("q") if deletes else None
+    return None
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Logs Mongo commands slower than `threshold_ms` with their filter shape.
+
+    The last RECENT_SLOW_QUERIES entries are kept in memory for the admin view.
+    """
+
+    def __init__(self, threshold_ms: int = SLOW_QUERY_MS):
+        self.threshold_ms = threshold_ms
+        self.recent = deque(maxlen=RECENT_SLOW_QUERIES)
+        self._commands: Dict[Tuple, Tuple[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._commands[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def _finish(self, event, outcome: str, reply: Optional[Dict] = None):
+        with self._lock:
+            started = self._commands.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+        database, command = started
+        collection = command.get(event.command_name)
+        returned = None
+        if reply:
+            cursor = reply.get("cursor")
+            if isinstance(cursor, dict):
+                returned = len(cursor.get("firstBatch", []))
+            elif "n" in reply:
+                returned = reply["n"]
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "database": database,
+            "collection": collection if isinstance(collection, str) else None,
+            "command": event.command_name,
+            "filter_shape": query_shape(command_filter(event.command_name, command) or {}),
+            "duration_ms": round(duration_ms, 2),
+            "docs_returned": returned,
+            "outcome": outcome,
+        }
+        self.recent.append(entry)
+        logger.warning(
+            f"Slow {entry['command']} on {entry['collection']}: {entry['duration_ms']}ms "
+            f"filter={entry['filter_shape']} returned={returned}"
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "success", event.reply)
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+
+slow_query_listener = SlowQueryListener()
+
+
+async def enable_profiler(db, threshold_ms: int = SLOW_QUERY_MS):
+    """Turn on Mongo's slow-op profiler so system.profile records docs examined"""
+    try:
+        await db.command("profile", 1, slowms=threshold_ms)
+    except Exception as e:
+        # Managed tiers (e.g. Atlas shared clusters) do not allow the profile command
+        logger.warning(f"Could not enable Mongo profiler: {e}")
+
+
+async def profiled_slow_queries(db, limit: int = 100) -> List[Dict]:
+    """Read slow operations recorded by Mongo's profiler, including docs examined"""
+    entries = await db["system.profile"].find(
+        {"millis": {"$gte": SLOW_QUERY_MS}},
+        {"_id": 0, "op": 1, "ns": 1, "command": 1, "millis": 1, "ts": 1,
+         "docsExamined": 1, "keysExamined": 1, "nreturned": 1, "planSummary": 1}
+    ).sort("ts", -1).limit(limit).to_list(limit)
+    results = []
+    for entry in entries:
+        command = entry.get("command") or {}
+        command_name = next(iter(command), entry.get("op"))
+        results.append({
+            "at": entry["ts"].isoformat() if entry.get("ts") else None,
+            "namespace": entry.get("ns"),
+            "command": command_name,
+            "filter_shape": query_shape(command_filter(command_name, command) or {}),
+            "duration_ms": entry.get("millis"),
+            "docs_examined": entry.get("docsExamined"),
+            "keys_examined": entry.get("keysExamined"),
+            "docs_returned": entry.get("nreturned"),
+            "plan": entry.get("planSummary"),
+        })
+    return results
+
+
+# Query shapes issued by server.py. Hot-path shapes must never plan a COLLSCAN.
+QUERY_SHAPES: List[Dict] = [
+    {"name": "login", "collection": "users", "filter": {"email": "a@example.com"}, "hot": True},
+    {"name": "current_user", "collection": "users", "filter": {"id": "u"}, "hot": True},
+    {"name": "pincode_check", "collection": "businesses", "filter": {"pin_codes": "CO1"}, "hot": True},
+    {"name": "business_lookup", "collection": "businesses", "filter": {"id": "b"}, "hot": True},
+    {"name": "product_listing", "collection": "products", "filter": {},
+     "sort": {"sort_order": 1, "name": 1}, "hot": True},
+    {"name": "product_listing_by_category", "collection": "products", "filter": {"category": "c"},
+     "sort": {"sort_order": 1, "name": 1}, "hot": True},
+    {"name": "product_listing_by_business", "collection": "products",
+     "filter": {"business_id": "b", "category": "c"}, "sort": {"sort_order": 1, "name": 1}, "hot": True},
+    {"name": "product_lookup", "collection": "products", "filter": {"id": "p"}, "hot": True},
+    {"name": "order_lookup", "collection": "orders", "filter": {"id": "o"}, "hot": True},
+    {"name": "customer_orders", "collection": "orders", "filter": {"user_id": "u"},
+     "sort": {"created_at": -1}, "hot": True},
+    {"name": "next_order_number", "collection": "orders", "filter": {},
+     "sort": {"order_number": -1}, "limit": 1, "hot": True},
+    {"name": "business_scope", "collection": "businesses", "filter": {"owner_email": "a@example.com"}, "hot": True},
+    {"name": "admin_orders", "collection": "orders", "filter": {}, "sort": {"created_at": -1}, "hot": False},
+    {"name": "business_admin_orders", "collection": "orders", "filter": {"business_id": {"$in": ["b"]}},
+     "sort": {"created_at": -1}, "hot": True},
+    {"name": "business_admin_products", "collection": "products", "filter": {"business_id": {"$in": ["b"]}},
+     "hot": True},
+    {"name": "order_export", "collection": "orders", "filter": {"business_id": "b"},
+     "sort": {"created_at": 1}, "hot": False},
+    {"name": "pickup_routes", "collection": "orders",
+     "filter": {"business_id": "b", "pickup_date": "2024-01-01", "status": {"$in": ["pending", "confirmed"]}},
+     "hot": False},
+]
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def explain_shape(db, shape: Dict) -> Dict:
+    find = {"find": shape["collection"], "filter": shape["filter"]}
+    if shape.get("sort"):
+        find["sort"] = shape["sort"]
+    if shape.get("limit"):
+        find["limit"] = shape["limit"]
+    explained = await db.command({"explain": find, "verbosity": "queryPlanner"})
+    stages = _plan_stages(explained["queryPlanner"]["winningPlan"])
+    return {"name": shape["name"], "hot": shape["hot"], "stages": stages, "collscan": "COLLSCAN" in stages}
+
+
+async def check_query_plans(db, shapes: List[Dict] = QUERY_SHAPES) -> List[Dict]:
+    """Explain every registered shape; returns the hot-path shapes that plan a COLLSCAN"""
+    await ensure_indexes(db)
+    failures = []
+    for shape in shapes:
+        result = await explain_shape(db, shape)
+        marker = "COLLSCAN" if result["collscan"] else "ok"
+        print(f"{'*' if shape['hot'] else ' '} {shape['name']:<30} {marker:<8} {' <- '.join(result['stages'])}")
+        if result["collscan"] and shape["hot"]:
+            failures.append(result)
+    return failures
+
+
+async def _main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    try:
+        failures = await check_query_plans(client[args.db_name])
+    finally:
+        client.close()
+    if failures:
+        print(f"\n{len(failures)} hot-path queries plan a COLLSCAN: {', '.join(f['name'] for f in failures)}")
+        return 1
+    print("\nAll hot-path queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if a hot-path query shape plans a collection scan")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("QUERY_GUARD_DB", "laundry_query_guard"))
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,87 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from pymongo import ReturnDocument
+
+from metrics import Counter
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Requests rejected by a rate limiter", ("limiter",)
+)
+
+
+class InMemoryBucketStore:
+    """Token buckets held in this process; least recently used keys are evicted first"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class MongoBucketStore:
+    """Token buckets shared by all workers, updated atomically in one round trip"""
+
+    def __init__(self, db, collection: str = "rate_limits"):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        # Idle buckets are full again after their window, so Mongo can simply expire them
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, rate]},
+        ]}]}
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=capacity / rate)
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now, "expires_at": expires_at}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"], doc["tokens"]
+
+
+class RateLimiter:
+    """Token bucket allowing `capacity` requests per `period` seconds per key, with bursts up to capacity"""
+
+    def __init__(self, name: str, capacity: int, period: float, store):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.store = store
+
+    async def hit(self, key: str) -> float:
+        """Consume one token for `key`; returns 0 if allowed, else seconds until a token is available"""
+        allowed, tokens = await self.store.take(f"{self.name}:{key}", self.capacity, self.rate, time.time())
+        if allowed:
+            return 0.0
+        RATE_LIMIT_REJECTIONS.inc(limiter=self.name)
+        return (1 - tokens) / self.rate
+
+
+def limiter_from_env(name: str, env_var: str, default: str, store) -> RateLimiter:
+    """Build a limiter from a "requests/seconds" setting such as "5/300" """
+    capacity, period = os.environ.get(env_var, default).split("/")
+    return RateLimiter(name, int(capacity), float(period), store)
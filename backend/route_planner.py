@@ -0,0 +1,202 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Approximate centroids (lat, lon) of the postcode districts we serve.
+# Routing only needs relative distances, so district-level accuracy is enough
+# and keeps the whole planner free of external geocoding calls.
+POSTCODE_CENTROIDS: Dict[str, Tuple[float, float]] = {
+    "CO1": (51.8891, 0.9042),
+    "CO2": (51.8743, 0.8873),
+    "CO3": (51.8858, 0.8612),
+    "CO4": (51.9093, 0.9251),
+    "CO5": (51.8290, 0.8557),
+    "CO6": (51.9405, 0.7988),
+    "CO7": (51.8867, 1.0243),
+    "CO8": (51.9700, 0.7750),
+    "CO9": (51.9603, 0.6044),
+    "CO10": (52.0376, 0.7290),
+    "CO11": (51.9393, 1.0691),
+    "CO12": (51.9352, 1.2558),
+    "CO13": (51.8209, 1.2279),
+    "CO14": (51.8461, 1.2570),
+    "CO15": (51.7912, 1.1538),
+    "CO16": (51.8239, 1.1012),
+    "CM0": (51.6698, 0.8251),
+    "CM1": (51.7420, 0.4543),
+    "CM2": (51.7252, 0.4861),
+    "CM3": (51.7142, 0.5872),
+    "CM7": (51.8780, 0.5530),
+    "CM8": (51.7950, 0.6380),
+    "CM9": (51.7306, 0.6764),
+    "IP1": (52.0641, 1.1424),
+    "IP2": (52.0419, 1.1344),
+    "IP3": (52.0428, 1.1830),
+    "IP4": (52.0593, 1.1752),
+    "IP7": (52.0548, 0.9546),
+    "IP8": (52.0487, 1.0806),
+    "IP9": (51.9925, 1.1724),
+    "IP11": (51.9699, 1.3346),
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+# Orders still waiting to be collected: placed or confirmed, but not yet processing,
+# completed or cancelled
+PICKUP_STATUSES = ("pending", "confirmed")
+
+
+def postcode_district(pin_code: str) -> str:
+    """Return the outward code (district) of a UK postcode, e.g. CO2 7FQ -> CO2"""
+    code = (pin_code or "").replace(" ", "").upper()
+    # Full postcodes always end with a 3-character inward code
+    if len(code) >= 5:
+        return code[:-3]
+    return code
+
+
+def distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Equirectangular distance approximation, accurate at city scale"""
+    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
+    x = (lon2 - lon1) * math.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS_KM * math.hypot(x, y)
+
+
+def _tour_length(tour: List[int], matrix: List[List[float]]) -> float:
+    return sum(matrix[tour[i]][tour[i + 1]] for i in range(len(tour) - 1))
+
+
+def _nearest_neighbour(matrix: List[List[float]], start: int) -> List[int]:
+    unvisited = set(range(len(matrix)))
+    unvisited.discard(start)
+    tour = [start]
+    current = start
+    while unvisited:
+        row = matrix[current]
+        current = min(unvisited, key=row.__getitem__)
+        unvisited.remove(current)
+        tour.append(current)
+    return tour
+
+
+def _two_opt(tour: List[int], matrix: List[List[float]], max_passes: int = 50) -> List[int]:
+    # Open path: the first point is fixed (the depot) and the last one is free
+    n = len(tour)
+    if n < 4:
+        return tour
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            row_a, row_b = matrix[a], matrix[b]
+            for j in range(i + 1, n):
+                c = tour[j]
+                d = tour[j + 1] if j + 1 < n else None
+                before = row_a[b] + (matrix[c][d] if d is not None else 0.0)
+                after = row_a[c] + (row_b[d] if d is not None else 0.0)
+                if after < before - 1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    b = tour[i]
+                    row_b = matrix[b]
+                    improved = True
+        if not improved:
+            break
+    return tour
+
+
+def order_points(points: List[Tuple[float, float]], start: Tuple[float, float]) -> Tuple[List[int], float]:
+    """Order points with nearest-neighbour + 2-opt, starting from `start`.
+
+    Returns the visiting order as indexes into `points` and the path length in km.
+    """
+    if not points:
+        return [], 0.0
+    nodes = [start] + points
+    matrix = [[distance_km(p, q) for q in nodes] for p in nodes]
+    tour = _two_opt(_nearest_neighbour(matrix, 0), matrix)
+    return [i - 1 for i in tour[1:]], _tour_length(tour, matrix)
+
+
+def plan_routes(orders: List[Dict], start_pin_code: Optional[str] = None, max_stops: int = 25) -> Dict:
+    """Group pickups by postcode district and split them into driver manifests.
+
+    Stops sharing a district share its centroid, so routing runs over the distinct
+    districts rather than every stop; this keeps thousands of stops cheap to plan.
+    """
+    districts: Dict[str, List[Dict]] = {}
+    unrouted = []
+    for order in orders:
+        district = postcode_district(order.get("pin_code", ""))
+        if district in POSTCODE_CENTROIDS:
+            districts.setdefault(district, []).append(order)
+        else:
+            unrouted.append(order)
+
+    start_district = postcode_district(start_pin_code) if start_pin_code else None
+    if start_district in POSTCODE_CENTROIDS:
+        start = POSTCODE_CENTROIDS[start_district]
+    elif districts:
+        start = POSTCODE_CENTROIDS[max(districts, key=lambda d: len(districts[d]))]
+    else:
+        start = (0.0, 0.0)
+
+    names = sorted(districts)
+    order_idx, _ = order_points([POSTCODE_CENTROIDS[d] for d in names], start)
+
+    # Walk the district tour and cut it into manifests of at most max_stops,
+    # so each driver covers a contiguous stretch of the overall route
+    manifests = []
+    current: List[Tuple[str, Dict]] = []
+    for idx in order_idx:
+        district = names[idx]
+        stops = sorted(districts[district], key=lambda o: (o.get("pickup_time") or "", o.get("address") or ""))
+        for stop in stops:
+            if len(current) >= max_stops:
+                manifests.append(current)
+                current = []
+            current.append((district, stop))
+    if current:
+        manifests.append(current)
+
+    result = []
+    for number, manifest in enumerate(manifests, start=1):
+        points = [POSTCODE_CENTROIDS[district] for district, _ in manifest]
+        distance = 0.0
+        previous = start
+        for point in points:
+            distance += distance_km(previous, point)
+            previous = point
+        district_list = []
+        for district, _ in manifest:
+            if not district_list or district_list[-1] != district:
+                district_list.append(district)
+        result.append({
+            "driver": number,
+            "districts": district_list,
+            "stop_count": len(manifest),
+            "distance_km": round(distance, 2),
+            "stops": [
+                {
+                    "sequence": seq,
+                    "order_id": stop.get("id"),
+                    "order_number": stop.get("order_number"),
+                    "customer_name": stop.get("user_name"),
+                    "address": stop.get("address"),
+                    "pin_code": stop.get("pin_code"),
+                    "district": district,
+                    "pickup_time": stop.get("pickup_time"),
+                    "pickup_instruction": stop.get("pickup_instruction"),
+                }
+                for seq, (district, stop) in enumerate(manifest, start=1)
+            ],
+        })
+
+    return {
+        "total_stops": len(orders),
+        "manifests": result,
+        "unrouted": [
+            {"order_id": o.get("id"), "order_number": o.get("order_number"), "pin_code": o.get("pin_code")}
+            for o in unrouted
+        ],
+    }
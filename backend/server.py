@@ -1,34 +1,87 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, UploadFile, File, BackgroundTasks, Request, status
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
+import io
+import json
+import csv
+import math
+import time
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-import stripe
+from functools import lru_cache
+from auth_tokens import ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL, TokenError, TokenVerifier
 from email_service import send_order_confirmation_email, send_status_update_email, send_admin_order_notification
+from route_planner import PICKUP_STATUSES, plan_routes
+from order_export import EXPORT_PROJECTION, stream_csv, stream_ndjson
+from order_views import SUMMARY_PROJECTION, hydrate_orders, hydrated_batches, order_summary_pipeline, slim_line_item
+from fieldsets import BUSINESS_FIELDS, ORDER_LIST_FIELDS, PRODUCT_FIELDS, projection, select_fields
+from order_archive import INDEX_COLLECTION as ARCHIVE_INDEX, ArchiveUnavailable, OrderArchive
+from order_history import get_history, record_order, record_status_change
+from product_import import import_products, iter_csv_rows
+from pricing import adjusted_price_expression, catalog_filter
+from business_cache import business_names
+from cache_bus import CacheInvalidationBus
+from catalog_tree import catalog_tree
+from product_search import search_index
+from admission import AdmissionControlMiddleware
+from jobs import JobQueue, JobWorker
+from stripe_webhooks import (
+    PAYMENT_CURRENCY, PaymentEventProcessor, SignatureError, store_event, to_minor_units, verify_signature
+)
+from metrics import (
+    EMAIL_SENDS, STRIPE_CALLS, STRIPE_CALL_DURATION, MetricsMiddleware, MongoCommandMetrics, MongoPoolMetrics,
+    render_metrics
+)
+from mongo_pool import catalog_read_preference, mongo_client_options, warm_up
+from rate_limit import InMemoryBucketStore, MongoBucketStore, limiter_from_env
+from indexes import ensure_indexes
+from tenancy import admin_business_ids, backfill_order_business_ids, can_access, order_business_id, scoped
+from query_profiler import enable_profiler, profiled_slow_queries, slow_query_listener
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_options = mongo_client_options()
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandMetrics(), MongoPoolMetrics(), slow_query_listener],
+    **mongo_options
+)
 db = client[os.environ['DB_NAME']]
+CATALOG_READ_PREFERENCE = catalog_read_preference()
+cache_bus = CacheInvalidationBus(db)
+payment_events = PaymentEventProcessor(db)
+job_queue = JobQueue(db)
+job_worker = JobWorker(job_queue)
+cache_bus.subscribe("businesses", lambda collection, business_id: business_names.invalidate(business_id))
+cache_bus.subscribe("products", catalog_tree.invalidate)
+cache_bus.subscribe("products", lambda collection, product_id: search_index.refresh_later(db.products, product_id))
 
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 JWT_SECRET = os.environ.get('JWT_SECRET')
 JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+tokens = TokenVerifier(JWT_SECRET, JWT_ALGORITHM)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Auth endpoints are throttled before any bcrypt work; "mongo" shares buckets across workers.
+# Per-IP limits are loose because offices and mobile networks share one address; the per-email
+# limits are what protect an account.
+rate_limit_store = MongoBucketStore(db) if os.environ.get('RATE_LIMIT_STORE') == 'mongo' else InMemoryBucketStore()
+login_ip_limiter = limiter_from_env("login_ip", "RATE_LIMIT_LOGIN_IP", "100/60", rate_limit_store)
+login_email_limiter = limiter_from_env("login_email", "RATE_LIMIT_LOGIN_EMAIL", "5/300", rate_limit_store)
+register_ip_limiter = limiter_from_env("register_ip", "RATE_LIMIT_REGISTER_IP", "30/3600", rate_limit_store)
+register_email_limiter = limiter_from_env("register_email", "RATE_LIMIT_REGISTER_EMAIL", "3/3600", rate_limit_store)
+
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
@@ -42,6 +95,9 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -94,6 +150,7 @@ class OrderCreate(BaseModel):
     address: str
     pin_code: str
     payment_method: str
+    payment_intent_id: Optional[str] = None
     total_amount: float
 
 class Order(BaseModel):
@@ -126,6 +183,11 @@ class BusinessCreate(BaseModel):
     owner_email: str
     pin_codes: List[str]
 
+class BusinessUpdate(BaseModel):
+    name: Optional[str] = None
+    owner_email: Optional[str] = None
+    pin_codes: Optional[List[str]] = None
+
 class ProductCreate(BaseModel):
     business_id: str
     service_type: str
@@ -139,39 +201,136 @@ class ProductCreate(BaseModel):
 class OrderStatusUpdate(BaseModel):
     status: str
 
+PRICE_PREVIEW_LIMIT = 1000
+
+class BulkPriceAdjustment(BaseModel):
+    business_id: str
+    mode: Literal["percent", "absolute"]
+    amount: float
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    price_endings: Optional[List[float]] = None
+    dry_run: bool = False
+
+def catalog(collection: str):
+    # Catalog and coverage reads tolerate bounded staleness, so they may go to secondaries
+    return db.get_collection(collection, read_preference=CATALOG_READ_PREFERENCE)
+
+async def publish_product_change(product_id: Optional[str] = None):
+    # Other workers hear about the write through the bus; this one drops its caches directly
+    catalog_tree.invalidate()
+    await search_index.refresh(db.products, product_id)
+    await cache_bus.publish("products", product_id)
+
+# Payment and hashing libraries are imported on first use to keep worker cold starts fast
+@lru_cache(maxsize=1)
+def get_stripe():
+    import stripe
+    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+    return stripe
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=7)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return tokens.issue(data, "access", ACCESS_TOKEN_TTL)
+
+def create_refresh_token(user_id: str) -> str:
+    return tokens.issue({"sub": user_id}, "refresh", REFRESH_TOKEN_TTL)
+
+def auth_response(user: dict) -> dict:
+    # Access tokens carry the profile fields handlers need, so verifying one replaces the users lookup
+    profile = {"id": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]}
+    token = create_access_token({"sub": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]})
+    return {"token": token, "expires_in": int(ACCESS_TOKEN_TTL.total_seconds()), "user": profile}
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except JWTError:
+        payload = tokens.verify(credentials.credentials)
+    except TokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if "name" in payload and "role" in payload:
+        return {"id": payload["sub"], "email": payload["email"], "name": payload["name"], "role": payload["role"]}
+    # Long-lived tokens issued before profile claims still need the lookup until they expire
+    user = await db.users.find_one({"id": payload["sub"]}, {"_id": 0})
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy this is only the real client if uvicorn runs with --proxy-headers and --forwarded-allow-ips
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limits(*checks):
+    for limiter, key in checks:
+        retry_after = await limiter.hit(key)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+def sparse_fields(allowed):
+    # `fields=a,b` on list endpoints, checked against the endpoint's whitelist
+    def dependency(fields: Optional[str] = Query(None, description="Comma-separated fields to return")):
+        try:
+            return select_fields(fields, allowed)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return dependency
 
 async def get_admin_user(current_user: dict = Depends(get_current_user)):
     if current_user["role"] not in ["business_admin", "platform_admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def send_email(template: str, send) -> dict:
+    try:
+        result = await send
+    except Exception as e:
+        logger.error(f"Failed to send {template} email: {e}")
+        result = {"status": "error", "message": str(e)}
+    EMAIL_SENDS.inc(template=template, status=result.get("status", "error"))
+    return result
+
+EMAIL_SENDERS = {
+    "order_confirmation": lambda payload: send_order_confirmation_email(payload["order"], payload["recipient"]),
+    "admin_order_notification": lambda payload: send_admin_order_notification(payload["order"]),
+    "status_update": lambda payload: send_status_update_email(payload["order"], payload["status"], payload["recipient"]),
+}
+
+@job_queue.job("email", concurrency=4, max_attempts=6)
+async def email_job(payload: dict):
+    result = await send_email(payload["template"], EMAIL_SENDERS[payload["template"]](payload))
+    if result.get("status") != "success":
+        raise RuntimeError(result.get("message", "Email was not sent"))
+
+@job_queue.job("archive_orders", lease_seconds=300, max_attempts=3)
+async def archive_orders_job(payload: dict):
+    report = await OrderArchive(db).archive(payload.get("months", 12))
+    logger.info(f"Archived {report['archived']} orders created before {report['cutoff']}")
+
+if os.environ.get('ORDER_ARCHIVE_CRON'):
+    job_queue.cron(
+        "archive-orders", os.environ['ORDER_ARCHIVE_CRON'], "archive_orders",
+        {"months": int(os.environ.get('ORDER_ARCHIVE_MONTHS', '12'))}
+    )
+
 @api_router.post("/auth/register")
-async def register(user_data: UserRegister):
+async def register(user_data: UserRegister, request: Request):
+    await enforce_rate_limits(
+        (register_ip_limiter, client_ip(request)),
+        (register_email_limiter, user_data.email.lower())
+    )
     existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -187,18 +346,33 @@ async def register(user_data: UserRegister):
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.users.insert_one(user_doc)
+    await cache_bus.publish("users", user_id)
     
-    token = create_access_token({"sub": user_id, "email": user_data.email, "role": "customer"})
-    return {"token": token, "user": {"id": user_id, "email": user_data.email, "name": user_data.name, "role": "customer"}}
+    return {**auth_response(user_doc), "refresh_token": create_refresh_token(user_id)}
 
 @api_router.post("/auth/login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    await enforce_rate_limits(
+        (login_ip_limiter, client_ip(request)),
+        (login_email_limiter, credentials.email.lower())
+    )
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user or not verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_access_token({"sub": user["id"], "email": user["email"], "role": user["role"]})
-    return {"token": token, "user": {"id": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]}}
+    return {**auth_response(user), "refresh_token": create_refresh_token(user["id"])}
+
+@api_router.post("/auth/refresh")
+async def refresh_token(data: TokenRefresh):
+    try:
+        payload = tokens.verify(data.refresh_token, "refresh")
+    except TokenError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    # The one place a session re-reads the user, so role changes apply from the next access token
+    user = await db.users.find_one({"id": payload["sub"]}, {"_id": 0})
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return auth_response(user)
 
 @api_router.get("/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
@@ -206,7 +380,7 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 @api_router.post("/pincode/check", response_model=PinCodeResponse)
 async def check_pincode(data: PinCodeCheck):
-    businesses = await db.businesses.find(
+    businesses = await catalog("businesses").find(
         {"pin_codes": data.pin_code},
         {"_id": 0}
     ).to_list(100)
@@ -217,7 +391,12 @@ async def check_pincode(data: PinCodeCheck):
     }
 
 @api_router.get("/products")
-async def get_products(business_id: Optional[str] = None, category: Optional[str] = None, subcategory: Optional[str] = None):
+async def get_products(
+    business_id: Optional[str] = None,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(PRODUCT_FIELDS))
+):
     query = {}
     if business_id:
         query["business_id"] = business_id
@@ -226,16 +405,26 @@ async def get_products(business_id: Optional[str] = None, category: Optional[str
     if subcategory:
         query["subcategory"] = subcategory
     
-    products = await db.products.find(query, {"_id": 0}).sort([("sort_order", 1), ("name", 1)]).to_list(1000)
+    products = await catalog("products").find(query, projection(fields)).sort([("sort_order", 1), ("name", 1)]).to_list(1000)
     return products
 
+@api_router.get("/products/search")
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    business_id: Optional[List[str]] = Query(None)
+):
+    # Cached until the next product change, so built from the primary rather than a possibly lagging secondary
+    await search_index.ensure_loaded(db.products)
+    return search_index.search(q, limit, set(business_id) if business_id else None)
+
 @api_router.get("/service-types")
 async def get_service_types():
     pipeline = [
         {"$group": {"_id": "$service_type"}},
         {"$project": {"_id": 0, "name": "$_id"}}
     ]
-    service_types = await db.products.aggregate(pipeline).to_list(100)
+    service_types = await catalog("products").aggregate(pipeline).to_list(100)
     return service_types
 
 @api_router.get("/categories")
@@ -245,20 +434,44 @@ async def get_categories():
         {"$sort": {"_id": 1}},
         {"$project": {"_id": 0, "name": "$_id"}}
     ]
-    categories = await db.products.aggregate(pipeline).to_list(100)
+    categories = await catalog("products").aggregate(pipeline).to_list(100)
     return categories
 
+@api_router.get("/catalog/tree")
+async def get_catalog_tree(request: Request):
+    # Cached until the next product change, so built from the primary rather than a possibly lagging secondary
+    body, etag = await catalog_tree.get(db.products)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.post("/orders")
 async def create_order(order_data: OrderCreate, current_user: dict = Depends(get_current_user)):
     # Temporarily disabled for testing
     # if order_data.total_amount < 30:
     #     raise HTTPException(status_code=400, detail="Minimum order value is £30")
     
+    try:
+        business_id = order_business_id(item.business_id for item in order_data.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Stripe webhooks find the order through its payment intent, so an intent pays for one order only
+    payment_intent_id = order_data.payment_intent_id if order_data.payment_method == "stripe" else None
+    if payment_intent_id and await db.orders.find_one({"payment_intent_id": payment_intent_id}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="This payment has already been used for another order")
+    
     order_id = str(uuid.uuid4())
     
     # Generate 6-digit numeric order number
-    last_order = await db.orders.find({}, {"_id": 0, "order_number": 1}).sort("order_number", -1).limit(1).to_list(1)
-    order_number = (last_order[0]["order_number"] + 1) if last_order and "order_number" in last_order[0] else 100000
+    # Archived orders keep their numbers, so both collections count; each lookup is one index read
+    order_numbers = [100000 - 1]
+    for collection in (db.orders, db[ARCHIVE_INDEX]):
+        last_order = await collection.find({}, {"_id": 0, "order_number": 1}).sort("order_number", -1).limit(1).to_list(1)
+        if last_order and last_order[0].get("order_number") is not None:
+            order_numbers.append(last_order[0]["order_number"])
+    order_number = max(order_numbers) + 1
     
     order_doc = {
         "id": order_id,
@@ -266,7 +479,9 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         "user_id": current_user["id"],
         "user_name": current_user["name"],
         "user_email": current_user["email"],
-        "items": [item.model_dump() for item in order_data.items],
+        "business_id": business_id,
+        "items": [slim_line_item(item.model_dump()) for item in order_data.items],
+        "item_count": sum(item.quantity for item in order_data.items),
         "pickup_date": order_data.pickup_date,
         "pickup_time": order_data.pickup_time,
         "pickup_instruction": order_data.pickup_instruction,
@@ -277,51 +492,97 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         "pin_code": order_data.pin_code,
         "payment_method": order_data.payment_method,
         "payment_status": "pending" if order_data.payment_method == "stripe" else "cod",
+        **({"payment_intent_id": payment_intent_id} if payment_intent_id else {}),
         "total_amount": order_data.total_amount,
         "status": "pending",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.orders.insert_one(order_doc)
-    
-    # Send confirmation email to customer
     try:
-        await send_order_confirmation_email(order_doc, current_user["email"])
-    except Exception as e:
-        print(f"Failed to send customer confirmation email: {e}")
+        await db.orders.insert_one(order_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="This payment has already been used for another order")
+    await record_order(db, order_doc)
     
-    # Send notification email to admin
-    try:
-        await send_admin_order_notification(order_doc)
-    except Exception as e:
-        print(f"Failed to send admin notification email: {e}")
+    # Emails show the full cart details that the stored order no longer carries
+    email_order = {**order_doc, "items": [item.model_dump() for item in order_data.items]}
+    
+    # Emails go out from the job worker, with retries, so the customer isn't kept waiting
+    await job_queue.enqueue("email", {"template": "order_confirmation", "order": email_order, "recipient": current_user["email"]})
+    await job_queue.enqueue("email", {"template": "admin_order_notification", "order": email_order})
     
     return {"order_id": order_id, "order_number": order_number, "status": "success"}
 
 @api_router.post("/payment/create-intent")
 async def create_payment_intent(data: dict, current_user: dict = Depends(get_current_user)):
+    start = time.perf_counter()
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=int(data["amount"] * 100),
-            currency="gbp",
+        intent = get_stripe().PaymentIntent.create(
+            amount=to_minor_units(data["amount"]),
+            currency=PAYMENT_CURRENCY,
             metadata={"order_id": data.get("order_id")}
         )
+        STRIPE_CALLS.inc(operation="payment_intent.create", status="success")
         return {"client_secret": intent.client_secret}
     except Exception as e:
+        STRIPE_CALLS.inc(operation="payment_intent.create", status="error")
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        STRIPE_CALL_DURATION.observe(time.perf_counter() - start, operation="payment_intent.create")
+
+@api_router.post("/payment/webhook")
+async def stripe_webhook(request: Request):
+    secret = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    if not secret:
+        raise HTTPException(status_code=503, detail="Stripe webhooks are not configured")
+    payload = await request.body()
+    try:
+        verify_signature(payload, request.headers.get("stripe-signature", ""), secret)
+        event = json.loads(payload)
+        event_id = event["id"]
+    except SignatureError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid event payload")
+    # Orders are updated by the payment event processor, so Stripe gets its 2xx straight away
+    if await store_event(db, event):
+        payment_events.notify()
+    return {"received": True, "id": event_id}
 
 @api_router.get("/orders")
-async def get_orders(current_user: dict = Depends(get_current_user)):
-    query = {"user_id": current_user["id"]} if current_user["role"] == "customer" else {}
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_orders(
+    current_user: dict = Depends(get_current_user),
+    fields: Optional[List[str]] = Depends(sparse_fields(ORDER_LIST_FIELDS))
+):
+    if current_user["role"] == "customer":
+        query = {"user_id": current_user["id"]}
+    else:
+        query = scoped({}, await admin_business_ids(db, current_user))
+    pipeline = order_summary_pipeline(query, 1000, projection(fields, SUMMARY_PROJECTION))
+    orders = await db.orders.aggregate(pipeline).to_list(1000)
     return orders
 
+@api_router.get("/orders/history")
+async def get_order_history(current_user: dict = Depends(get_current_user)):
+    return await get_history(db, current_user["id"])
+
 @api_router.get("/orders/{order_id}")
 async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    if not order:
+        # Old finished orders live in the compressed archive
+        try:
+            order = await OrderArchive(db).find(order_id)
+        except ArchiveUnavailable as e:
+            logger.error(f"Archived order {order_id} could not be read: {e}")
+            raise HTTPException(status_code=503, detail="This order is archived and temporarily unavailable")
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    if current_user["role"] == "customer" and order["user_id"] != current_user["id"]:
+    if current_user["role"] == "customer":
+        if order["user_id"] != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
+    elif not can_access(await admin_business_ids(db, current_user), order.get("business_id")):
         raise HTTPException(status_code=403, detail="Access denied")
+    await hydrate_orders(db, [order])
     return order
 
 @api_router.patch("/admin/orders/{order_id}/status")
@@ -330,29 +591,36 @@ async def update_order_status(order_id: str, data: OrderStatusUpdate, admin: dic
     order = await db.orders.find_one({"id": order_id}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if not can_access(await admin_business_ids(db, admin), order.get("business_id")):
+        raise HTTPException(status_code=403, detail="Access denied")
     
+    # Only applies if nobody changed the status since we read it, so the history update below runs once per transition
     result = await db.orders.update_one(
-        {"id": order_id},
+        {"id": order_id, "status": order["status"]},
         {"$set": {"status": data.status}}
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=409, detail="The order status was changed by someone else; reload and try again")
+    await record_status_change(db, order, order["status"], data.status)
     
     # Update order dict with new status for email
     order["status"] = data.status
     
     # Send status update email to customer
-    try:
-        await send_status_update_email(order, data.status, order["user_email"])
-    except Exception as e:
-        print(f"Failed to send status update email: {e}")
+    await job_queue.enqueue("email", {
+        "template": "status_update", "order": order, "status": data.status, "recipient": order["user_email"]
+    })
     
     return {"status": "success"}
 
 @api_router.get("/admin/businesses")
-async def get_businesses(admin: dict = Depends(get_admin_user)):
-    businesses = await db.businesses.find({}, {"_id": 0}).to_list(1000)
+async def get_businesses(
+    admin: dict = Depends(get_admin_user),
+    fields: Optional[List[str]] = Depends(sparse_fields(BUSINESS_FIELDS))
+):
+    query = scoped({}, await admin_business_ids(db, admin), field="id")
+    businesses = await db.businesses.find(query, projection(fields)).to_list(1000)
     return businesses
 
 @api_router.post("/admin/businesses")
@@ -369,17 +637,59 @@ async def create_business(business_data: BusinessCreate, admin: dict = Depends(g
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.businesses.insert_one(business_doc)
+    business_names.set(business_id, business_data.name)
+    await cache_bus.publish("businesses", business_id)
     return {"business_id": business_id, "status": "success"}
 
+async def propagate_business_name(business_id: str, name: str):
+    result = await db.products.update_many(
+        {"business_id": business_id, "business_name": {"$ne": name}},
+        {"$set": {"business_name": name}}
+    )
+    await publish_product_change()
+    logger.info(f"Renamed business {business_id} on {result.modified_count} products")
+
+@api_router.put("/admin/businesses/{business_id}")
+async def update_business(
+    business_id: str,
+    business_data: BusinessUpdate,
+    background_tasks: BackgroundTasks,
+    admin: dict = Depends(get_admin_user)
+):
+    if admin["role"] not in ["platform_admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Platform admin access required")
+    
+    update_doc = business_data.model_dump(exclude_none=True)
+    if not update_doc:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    
+    result = await db.businesses.update_one({"id": business_id}, {"$set": update_doc})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Business not found")
+    
+    await cache_bus.publish("businesses", business_id)
+    if business_data.name is not None:
+        business_names.set(business_id, business_data.name)
+        # Products carry a denormalized copy of the name; refresh them after responding
+        background_tasks.add_task(propagate_business_name, business_id, business_data.name)
+    
+    return {"status": "success"}
+
 @api_router.get("/admin/products")
-async def get_admin_products(admin: dict = Depends(get_admin_user)):
-    products = await db.products.find({}, {"_id": 0}).to_list(1000)
+async def get_admin_products(
+    admin: dict = Depends(get_admin_user),
+    fields: Optional[List[str]] = Depends(sparse_fields(PRODUCT_FIELDS))
+):
+    query = scoped({}, await admin_business_ids(db, admin))
+    products = await db.products.find(query, projection(fields)).to_list(1000)
     return products
 
 @api_router.post("/admin/products")
 async def create_product(product_data: ProductCreate, admin: dict = Depends(get_admin_user)):
-    business = await db.businesses.find_one({"id": product_data.business_id}, {"_id": 0})
-    if not business:
+    if not can_access(await admin_business_ids(db, admin), product_data.business_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    business_name = await business_names.get_name(db, product_data.business_id)
+    if business_name is None:
         raise HTTPException(status_code=404, detail="Business not found")
     
     product_id = str(uuid.uuid4())
@@ -393,7 +703,7 @@ async def create_product(product_data: ProductCreate, admin: dict = Depends(get_
     product_doc = {
         "id": product_id,
         "business_id": product_data.business_id,
-        "business_name": business["name"],
+        "business_name": business_name,
         "service_type": product_data.service_type,
         "category": product_data.category,
         "subcategory": product_data.subcategory,
@@ -404,17 +714,77 @@ async def create_product(product_data: ProductCreate, admin: dict = Depends(get_
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.products.insert_one(product_doc)
+    await publish_product_change(product_id)
     return {"product_id": product_id, "status": "success"}
 
+@api_router.post("/admin/products/import")
+async def import_products_csv(
+    file: UploadFile = File(...),
+    business_id: Optional[str] = None,
+    service_type: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    scope = await admin_business_ids(db, admin)
+    if business_id and not can_access(scope, business_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await import_products(
+            db,
+            iter_csv_rows(stream),
+            ProductCreate,
+            business_id=business_id,
+            service_type=service_type,
+            allowed_business_ids=scope,
+        )
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+    finally:
+        stream.detach()
+    if report["inserted"] or report["updated"]:
+        await publish_product_change()
+    return {"status": "success", **report}
+
+@api_router.post("/admin/products/bulk-price")
+async def bulk_adjust_prices(data: BulkPriceAdjustment, admin: dict = Depends(get_admin_user)):
+    if data.price_endings and any(not 0 <= ending < 1 for ending in data.price_endings):
+        raise HTTPException(status_code=400, detail="price_endings must be between 0 and 1, e.g. 0.45")
+    if not can_access(await admin_business_ids(db, admin), data.business_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    query = catalog_filter(data.business_id, data.category, data.subcategory)
+    new_price = adjusted_price_expression(data.mode, data.amount, data.price_endings)
+    
+    if data.dry_run:
+        matched = await db.products.count_documents(query)
+        preview = await db.products.aggregate([
+            {"$match": query},
+            {"$sort": {"category": 1, "subcategory": 1, "sort_order": 1}},
+            {"$limit": PRICE_PREVIEW_LIMIT},
+            {"$project": {"_id": 0, "id": 1, "name": 1, "category": 1, "subcategory": 1,
+                          "price": 1, "new_price": new_price}}
+        ]).to_list(PRICE_PREVIEW_LIMIT)
+        # `products` lists at most PRICE_PREVIEW_LIMIT of the `matched` products the update would change
+        return {"status": "preview", "matched": matched, "truncated": matched > len(preview), "products": preview}
+    
+    # Single pipeline update: prices are computed server-side, no per-product round trips
+    result = await db.products.update_many(query, [{"$set": {"price": new_price}}])
+    if result.modified_count:
+        await publish_product_change()
+    return {"status": "success", "matched": result.matched_count, "updated": result.modified_count}
+
 @api_router.put("/admin/products/{product_id}")
 async def update_product(product_id: str, product_data: ProductCreate, admin: dict = Depends(get_admin_user)):
-    business = await db.businesses.find_one({"id": product_data.business_id}, {"_id": 0})
-    if not business:
+    scope = await admin_business_ids(db, admin)
+    if not can_access(scope, product_data.business_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    business_name = await business_names.get_name(db, product_data.business_id)
+    if business_name is None:
         raise HTTPException(status_code=404, detail="Business not found")
     
     update_doc = {
         "business_id": product_data.business_id,
-        "business_name": business["name"],
+        "business_name": business_name,
         "service_type": product_data.service_type,
         "category": product_data.category,
         "subcategory": product_data.subcategory,
@@ -427,50 +797,142 @@ async def update_product(product_id: str, product_data: ProductCreate, admin: di
         update_doc["sort_order"] = product_data.sort_order
     
     result = await db.products.update_one(
-        {"id": product_id},
+        scoped({"id": product_id}, scope),
         {"$set": update_doc}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await publish_product_change(product_id)
     return {"status": "success"}
 
 @api_router.delete("/admin/products/{product_id}")
 async def delete_product(product_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.products.delete_one({"id": product_id})
+    result = await db.products.delete_one(scoped({"id": product_id}, await admin_business_ids(db, admin)))
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await publish_product_change(product_id)
     return {"status": "success"}
 
 @api_router.get("/admin/orders")
-async def get_admin_orders(admin: dict = Depends(get_admin_user)):
-    orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_admin_orders(
+    admin: dict = Depends(get_admin_user),
+    fields: Optional[List[str]] = Depends(sparse_fields(ORDER_LIST_FIELDS))
+):
+    query = scoped({}, await admin_business_ids(db, admin))
+    pipeline = order_summary_pipeline(query, 1000, projection(fields, SUMMARY_PROJECTION))
+    orders = await db.orders.aggregate(pipeline).to_list(1000)
     return orders
 
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    format: str = "csv",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    business_id: Optional[str] = None,
+    order_status: Optional[str] = Query(None, alias="status"),
+    admin: dict = Depends(get_admin_user)
+):
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    
+    query = {}
+    try:
+        # created_at is stored as an ISO string, so date bounds compare lexically
+        if start_date:
+            query.setdefault("created_at", {})["$gte"] = datetime.fromisoformat(start_date).date().isoformat()
+        if end_date:
+            next_day = datetime.fromisoformat(end_date).date() + timedelta(days=1)
+            query.setdefault("created_at", {})["$lt"] = next_day.isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if business_id:
+        query["business_id"] = business_id
+    scoped(query, await admin_business_ids(db, admin))
+    if order_status:
+        query["status"] = order_status
+    
+    cursor = hydrated_batches(db, db.orders.find(query, EXPORT_PROJECTION).sort("created_at", 1).batch_size(1000))
+    if format == "csv":
+        body, media_type = stream_csv(cursor), "text/csv"
+    else:
+        body, media_type = stream_ndjson(cursor), "application/x-ndjson"
+    filename = f"orders-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/admin/jobs")
+async def get_job_queue(admin: dict = Depends(get_admin_user)):
+    if admin["role"] not in ["platform_admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Platform admin access required")
+    return await job_queue.depth()
+
 @api_router.get("/admin/stats")
 async def get_admin_stats(admin: dict = Depends(get_admin_user)):
-    total_orders = await db.orders.count_documents({})
+    scope = await admin_business_ids(db, admin)
+    total_orders = await db.orders.count_documents(scoped({}, scope))
     total_revenue = await db.orders.aggregate([
+        {"$match": scoped({}, scope)},
         {"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}
     ]).to_list(1)
-    total_businesses = await db.businesses.count_documents({})
-    total_products = await db.products.count_documents({})
+    archived_orders, archived_revenue = await OrderArchive(db).totals(scoped({}, scope))
+    total_businesses = await db.businesses.count_documents(scoped({}, scope, field="id"))
+    total_products = await db.products.count_documents(scoped({}, scope))
     
     revenue = total_revenue[0]["total"] if total_revenue else 0
     
     return {
-        "total_orders": total_orders,
-        "total_revenue": revenue,
+        "total_orders": total_orders + archived_orders,
+        "total_revenue": revenue + archived_revenue,
         "total_businesses": total_businesses,
         "total_products": total_products
     }
 
+@api_router.get("/admin/routes")
+async def get_pickup_routes(business_id: str, date: str, max_stops: int = 25, admin: dict = Depends(get_admin_user)):
+    if not can_access(await admin_business_ids(db, admin), business_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    business = await db.businesses.find_one({"id": business_id}, {"_id": 0})
+    if not business:
+        raise HTTPException(status_code=404, detail="Business not found")
+    if max_stops < 1:
+        raise HTTPException(status_code=400, detail="max_stops must be at least 1")
+    
+    orders = await db.orders.find(
+        {"business_id": business_id, "pickup_date": date, "status": {"$in": list(PICKUP_STATUSES)}},
+        {"_id": 0, "id": 1, "order_number": 1, "user_name": 1, "address": 1, "pin_code": 1,
+         "pickup_time": 1, "pickup_instruction": 1}
+    ).to_list(5000)
+    
+    # Drivers start from the business's first service area
+    start_pin_code = business["pin_codes"][0] if business.get("pin_codes") else None
+    routes = plan_routes(orders, start_pin_code=start_pin_code, max_stops=max_stops)
+    return {"business_id": business_id, "date": date, **routes}
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(admin: dict = Depends(get_admin_user)):
+    if admin["role"] not in ["platform_admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Platform admin access required")
+    
+    profiled = []
+    if os.environ.get('MONGO_PROFILE_SLOW_OPS', 'false').lower() == 'true':
+        profiled = await profiled_slow_queries(db)
+    return {
+        "threshold_ms": slow_query_listener.threshold_ms,
+        "recent": list(reversed(slow_query_listener.recent)),
+        "profiled": profiled
+    }
+
 @api_router.post("/admin/products/reorder")
 async def reorder_products(data: dict, admin: dict = Depends(get_admin_user)):
     updates = data.get("updates", [])
+    scope = await admin_business_ids(db, admin)
     
     for update in updates:
         product_id = update.get("id")
@@ -478,14 +940,23 @@ async def reorder_products(data: dict, admin: dict = Depends(get_admin_user)):
         
         if product_id and sort_order is not None:
             await db.products.update_one(
-                {"id": product_id},
+                scoped({"id": product_id}, scope),
                 {"$set": {"sort_order": sort_order}}
             )
     
+    if updates:
+        await publish_product_change()
     return {"status": "success", "updated": len(updates)}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
 
+# Inside CORS so shed requests still carry CORS headers, inside metrics so 503s are counted
+app.add_middleware(AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -494,12 +965,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    if os.environ.get('TRUST_PROXY_HEADERS'):
+        logger.warning("TRUST_PROXY_HEADERS is ignored; run uvicorn with --proxy-headers --forwarded-allow-ips instead")
+    await warm_up(db, mongo_options["minPoolSize"])
+    await ensure_indexes(db)
+    backfilled = await backfill_order_business_ids(db)
+    if backfilled:
+        logger.info(f"Set business_id on {backfilled} existing orders")
+    if os.environ.get('MONGO_PROFILE_SLOW_OPS', 'false').lower() == 'true':
+        await enable_profiler(db)
+    if isinstance(rate_limit_store, MongoBucketStore):
+        await rate_limit_store.ensure_indexes()
+    await job_queue.ensure_indexes()
+    await payment_events.ensure_indexes()
+    await cache_bus.start()
+    await payment_events.start()
+    # Set JOB_WORKER=false when jobs run in separate `python -m job_worker` processes
+    if os.environ.get('JOB_WORKER', 'true').lower() == 'true':
+        await job_worker.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await job_worker.stop()
+    await payment_events.stop()
+    await cache_bus.stop()
     client.close()
\ No newline at end of file
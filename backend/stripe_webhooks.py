@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "stripe_events"
+# Stripe rejects replays older than this by default, and so do we
+SIGNATURE_TOLERANCE_SECONDS = 300
+BATCH_SIZE = 100
+LEASE_SECONDS = 60
+# Payment can succeed before the order is placed; keep retrying the match for a while
+UNMATCHED_RETRY_SECONDS = 3600
+# Finished events only need to outlive Stripe's redelivery window (3 days) to keep deduplicating
+EVENT_RETENTION = timedelta(days=30)
+PAYMENT_CURRENCY = "gbp"
+PAYMENT_STATUSES = {
+    "payment_intent.succeeded": "paid",
+    "payment_intent.payment_failed": "failed",
+}
+
+STRIPE_WEBHOOK_EVENTS = Counter(
+    "stripe_webhook_events_total", "Stripe webhook events by type and outcome", ("type", "outcome")
+)
+
+
+def to_minor_units(amount: float) -> int:
+    """Pence for a pound amount; rounded, since prices like 8.95 are 894.999... as floats"""
+    return round(amount * 100)
+
+
+class SignatureError(ValueError):
+    pass
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Stripe-Signature header value for `payload`, as Stripe computes it"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance: int = SIGNATURE_TOLERANCE_SECONDS):
+    """Check a Stripe-Signature header; raises SignatureError unless one v1 signature matches"""
+    timestamp, signatures = None, []
+    for part in (header or "").split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise SignatureError("Malformed Stripe-Signature header")
+    if abs(time.time() - int(timestamp)) > tolerance:
+        raise SignatureError("Signature timestamp outside the tolerance window")
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise SignatureError("No matching signature")
+
+
+async def store_event(db, event: Dict) -> bool:
+    """Record a verified event once; returns False for a redelivery of an event already stored"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db[EVENTS_COLLECTION].insert_one({
+            "_id": event["id"],
+            "type": event.get("type"),
+            "created": event.get("created"),
+            "payload": event,
+            "status": "pending",
+            "attempts": 0,
+            "received_at": now,
+            "next_attempt_at": now,
+        })
+    except DuplicateKeyError:
+        STRIPE_WEBHOOK_EVENTS.inc(type=event.get("type", ""), outcome="duplicate")
+        return False
+    STRIPE_WEBHOOK_EVENTS.inc(type=event.get("type", ""), outcome="received")
+    return True
+
+
+def build_event(event_type: str, payment_intent_id: str, amount: int = 1000) -> Dict:
+    """A minimal Stripe event for local testing"""
+    return {
+        "id": f"evt_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "data": {"object": {
+            "id": payment_intent_id,
+            "object": "payment_intent",
+            "amount": amount,
+            "currency": PAYMENT_CURRENCY,
+            "status": "succeeded" if event_type == "payment_intent.succeeded" else "requires_payment_method",
+        }},
+    }
+
+
+class PaymentEventProcessor:
+    """Applies stored payment_intent events to orders in batches.
+
+    Each pass claims up to BATCH_SIZE due events with a lease, so several API
+    workers can run processors side by side. Per payment intent only the newest event
+    counts, a failure never overrides a recorded payment, a payment only marks its
+    order paid if amount and currency match the order total, and all order updates
+    of a batch go out as one bulk write. Events whose order does not exist yet stay
+    pending with backoff until UNMATCHED_RETRY_SECONDS have passed.
+    """
+
+    def __init__(self, db, poll_interval: Optional[float] = None):
+        self.db = db
+        self.poll_interval = poll_interval or float(os.environ.get("STRIPE_WEBHOOK_POLL_SECONDS", "2"))
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        # One order per payment intent; orders paid otherwise have no intent id
+        await self.db.orders.create_index(
+            "payment_intent_id", unique=True, partialFilterExpression={"payment_intent_id": {"$type": "string"}}
+        )
+        await self.db[EVENTS_COLLECTION].create_index("expire_at", expireAfterSeconds=0)
+
+    def notify(self):
+        self._wake.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.process_batch() == BATCH_SIZE:
+                    pass
+            except PyMongoError as e:
+                logger.warning(f"Stripe event processing failed: {e}")
+            except Exception:
+                # Anything else would end the task silently and stop applying payments in this process
+                logger.exception("Stripe event processing failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self) -> List[Dict]:
+        events = self.db[EVENTS_COLLECTION]
+        now = datetime.now(timezone.utc)
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "processing", "lease_until": {"$lt": now}},
+        ]}
+        candidates = await events.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not candidates:
+            return []
+        token = uuid.uuid4().hex
+        ids = [event["_id"] for event in candidates]
+        await events.update_many(
+            {"_id": {"$in": ids}, **due},
+            {"$set": {"status": "processing", "claim": token, "lease_until": now + timedelta(seconds=LEASE_SECONDS)}},
+        )
+        # Re-read by _id so the claim check never scans the collection
+        return await events.find({"_id": {"$in": ids}, "claim": token}).to_list(BATCH_SIZE)
+
+    async def process_batch(self) -> int:
+        """Process one batch of due events; returns how many were claimed"""
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+        events = self.db[EVENTS_COLLECTION]
+        now = datetime.now(timezone.utc)
+
+        latest: Dict[str, Dict] = {}
+        ignored = []
+        for event in claimed:
+            intent = event["payload"].get("data", {}).get("object", {})
+            if event["type"] not in PAYMENT_STATUSES or not intent.get("id"):
+                ignored.append(event["_id"])
+                continue
+            current = latest.get(intent["id"])
+            if current is None or (event.get("created") or 0) >= (current.get("created") or 0):
+                latest[intent["id"]] = event
+
+        found = await self.db.orders.find(
+            {"payment_intent_id": {"$in": list(latest)}}, {"_id": 0, "id": 1, "payment_intent_id": 1, "total_amount": 1}
+        ).to_list(None)
+        orders = {order["payment_intent_id"]: order for order in found}
+        matched = set(orders)
+
+        operations = []
+        for intent_id, order in orders.items():
+            payment_status = PAYMENT_STATUSES[latest[intent_id]["type"]]
+            query = {"payment_intent_id": intent_id}
+            if payment_status == "paid":
+                # The client picks the intent amount, so only a payment of exactly the order total counts
+                intent = latest[intent_id]["payload"]["data"]["object"]
+                if intent.get("amount") != to_minor_units(order["total_amount"]) or intent.get("currency") != PAYMENT_CURRENCY:
+                    logger.warning(
+                        f"Payment {intent_id} of {intent.get('amount')} (minor units, {intent.get('currency')}) "
+                        f"does not match order {order['id']} total of {order['total_amount']}"
+                    )
+                    payment_status = "amount_mismatch"
+            else:
+                # Card retries can fail before they succeed; a late failure must not undo a payment
+                query["payment_status"] = {"$ne": "paid"}
+            operations.append(UpdateOne(query, {"$set": {"payment_status": payment_status}}))
+        if operations:
+            await self.db.orders.bulk_write(operations, ordered=False)
+
+        processed = [event["_id"] for event in claimed if event["_id"] not in ignored
+                     and event["payload"]["data"]["object"]["id"] in matched]
+        unmatched = [event for event in claimed if event["_id"] not in ignored and event["_id"] not in processed]
+        expire_at = now + EVENT_RETENTION
+        if processed:
+            await events.update_many({"_id": {"$in": processed}}, {
+                "$set": {"status": "processed", "processed_at": now, "expire_at": expire_at}, "$unset": {"claim": ""},
+            })
+        if ignored:
+            await events.update_many({"_id": {"$in": ignored}}, {
+                "$set": {"status": "ignored", "processed_at": now, "expire_at": expire_at}, "$unset": {"claim": ""},
+            })
+        for event in unmatched:
+            attempts = event.get("attempts", 0) + 1
+            received_at = event["received_at"].replace(tzinfo=event["received_at"].tzinfo or timezone.utc)
+            expired = (now - received_at).total_seconds() > UNMATCHED_RETRY_SECONDS
+            update = {
+                "status": "unmatched" if expired else "pending",
+                "attempts": attempts,
+                "next_attempt_at": now + timedelta(seconds=min(2 ** attempts, 300)),
+            }
+            if expired:
+                update["expire_at"] = expire_at
+            await events.update_one({"_id": event["_id"]}, {"$set": update, "$unset": {"claim": ""}})
+        for event in claimed:
+            outcome = "ignored" if event["_id"] in ignored else "applied" if event["_id"] in processed else "retry"
+            STRIPE_WEBHOOK_EVENTS.inc(type=event["type"] or "", outcome=outcome)
+        return len(claimed)
+
+
+def _fixture(args):
+    payload = json.dumps(build_event(args.type, args.payment_intent_id, args.amount)).encode()
+    header = sign_payload(payload, args.secret)
+    print(f"curl -X POST {args.url} -H 'Content-Type: application/json' "
+          f"-H 'Stripe-Signature: {header}' --data '{payload.decode()}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a signed Stripe webhook request for local testing")
+    parser.add_argument("type", choices=sorted(PAYMENT_STATUSES))
+    parser.add_argument("payment_intent_id")
+    parser.add_argument("--amount", type=int, default=1000, help="Amount in pence")
+    parser.add_argument("--secret", default=os.environ.get("STRIPE_WEBHOOK_SECRET", "whsec_test"))
+    parser.add_argument("--url", default="http://localhost:8001/api/payment/webhook")
+    _fixture(parser.parse_args())
@@ -0,0 +1,52 @@
+from typing import Dict, Iterable, List, Optional
+
+PLATFORM_ROLES = ("platform_admin", "super_admin")
+# Carts were not always limited to one business, so older orders may hold several
+_ITEM_BUSINESS_COUNT = {"$size": {"$setUnion": [{"$ifNull": ["$items.business_id", []]}, []]}}
+SINGLE_BUSINESS_ORDER = {"$expr": {"$lte": [_ITEM_BUSINESS_COUNT, 1]}}
+MIXED_BUSINESS_ORDER = {"$expr": {"$gt": [_ITEM_BUSINESS_COUNT, 1]}}
+
+
+async def admin_business_ids(db, admin: Dict) -> Optional[List[str]]:
+    """Businesses an admin may see; None means every business (platform admins)"""
+    if admin["role"] in PLATFORM_ROLES:
+        return None
+    businesses = await db.businesses.find({"owner_email": admin["email"]}, {"_id": 0, "id": 1}).to_list(None)
+    return [business["id"] for business in businesses]
+
+
+def scoped(query: Dict, business_ids: Optional[List[str]], field: str = "business_id") -> Dict:
+    """Restrict `query` to the given businesses, keeping any narrower business filter already in it"""
+    if business_ids is None:
+        return query
+    requested = query.get(field)
+    if isinstance(requested, str):
+        query[field] = requested if requested in business_ids else {"$in": []}
+    else:
+        query[field] = {"$in": business_ids}
+    return query
+
+
+def can_access(business_ids: Optional[List[str]], business_id: Optional[str]) -> bool:
+    return business_ids is None or business_id in business_ids
+
+
+def order_business_id(business_ids: Iterable[str]) -> str:
+    """The single business fulfilling an order; raises ValueError for mixed carts"""
+    distinct = set(business_ids)
+    if len(distinct) != 1:
+        raise ValueError("An order must contain items from exactly one business")
+    return distinct.pop()
+
+
+async def backfill_order_business_ids(db) -> int:
+    """Copy the business of the line items onto orders created before orders carried `business_id`.
+
+    Mixed-business orders are left without one rather than credited to the first
+    item's business; only platform admins see them.
+    """
+    result = await db.orders.update_many(
+        {"business_id": {"$exists": False}, **SINGLE_BUSINESS_ORDER},
+        [{"$set": {"business_id": {"$arrayElemAt": ["$items.business_id", 0]}}}],
+    )
+    return result.modified_count
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_BASELINE = Path(__file__).parent / "benchmark_baseline.json"
+
+# Fixed sizes so numbers stay comparable between runs
+CART_ITEMS = 200
+EMAIL_ITEMS = 50
+LIST_SIZE = 1000
+REORDER_UPDATES = 500
+
+
+def make_cart_item(i):
+    return {
+        "product_id": str(uuid.uuid4()),
+        "product_name": f"Item {i}",
+        "category": "Dry Cleaning",
+        "subcategory": "Shirts",
+        "business_id": "business-1",
+        "business_name": "Laundry Express",
+        "price": 6.45,
+        "quantity": 1 + i % 3,
+    }
+
+
+def make_order(i, items):
+    return {
+        "id": str(uuid.uuid4()),
+        "order_number": 100000 + i,
+        "user_id": "user-1",
+        "user_name": "Benchmark Customer",
+        "user_email": "customer@benchmark.example",
+        "business_id": "business-1",
+        "items": items,
+        "pickup_date": "2024-06-01",
+        "pickup_time": "09:00-11:00",
+        "pickup_instruction": "in-person",
+        "delivery_date": "2024-06-03",
+        "delivery_time": "14:00-16:00",
+        "delivery_instruction": "ring-wait",
+        "address": "1 Benchmark Street",
+        "pin_code": "CO1 1AB",
+        "payment_method": "cod",
+        "payment_status": "cod",
+        "total_amount": round(sum(item["price"] * item["quantity"] for item in items), 2),
+        "status": "pending",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def make_product(i):
+    return {
+        "id": str(uuid.uuid4()),
+        "business_id": "business-1",
+        "business_name": "Laundry Express",
+        "service_type": "Laundry Service",
+        "category": "Dry Cleaning",
+        "subcategory": "Shirts",
+        "name": f"Product {i}",
+        "price": 6.45,
+        "icon_url": None,
+        "sort_order": i,
+        "category_sort_order": None,
+        "subcategory_sort_order": None,
+    }
+
+
+class BenchmarkSuite:
+    """Times server hot paths; each benchmark is a zero-argument callable or coroutine function"""
+
+    def __init__(self, server, db, loop, rounds, min_time):
+        self.server = server
+        self.db = db
+        self.loop = loop
+        self.rounds = rounds
+        self.min_time = min_time
+        self.results = {}
+
+    def measure(self, name, func, is_async=False):
+        call = (lambda: self.loop.run_until_complete(func())) if is_async else func
+        call()
+        # Calibrate iterations so each round runs for at least min_time
+        iterations = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time or iterations >= 1_000_000:
+                break
+            iterations *= 2
+        samples = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            samples.append((time.perf_counter() - start) / iterations * 1_000_000)
+        self.results[name] = {
+            "min_us": round(min(samples), 2),
+            "median_us": round(statistics.median(samples), 2),
+            "mean_us": round(statistics.mean(samples), 2),
+            "iterations": iterations,
+            "rounds": self.rounds,
+        }
+        print(f"   {name:<36} median {self.results[name]['median_us']:>12.2f} µs")
+
+    def run(self):
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+        from fastapi.security import HTTPAuthorizationCredentials
+        from email_service import (
+            generate_admin_notification_email, generate_order_confirmation_email, generate_status_update_email
+        )
+
+        server = self.server
+        user = {"id": "user-1", "email": "customer@benchmark.example", "name": "Benchmark Customer",
+                "phone": "07000000000", "role": "customer", "password": "x",
+                "created_at": datetime.now(timezone.utc).isoformat()}
+        admin = dict(user, id="admin-1", role="platform_admin")
+        self.loop.run_until_complete(self.db.users.insert_many([dict(user), dict(admin)]))
+
+        claims = {"sub": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]}
+        token = server.create_access_token(claims)
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        self.measure("jwt_encode", lambda: server.create_access_token(claims))
+
+        def get_current_user_uncached():
+            # Forget verified tokens so every call decodes the JWT, as the first request with a token does
+            server.tokens._verified.clear()
+            return server.get_current_user(credentials)
+
+        self.measure("jwt_decode_current_user", get_current_user_uncached, is_async=True)
+        self.measure("jwt_decode_current_user_cached", lambda: server.get_current_user(credentials), is_async=True)
+
+        order_payload = make_order(0, [make_cart_item(i) for i in range(CART_ITEMS)])
+        self.measure(f"order_create_validation_{CART_ITEMS}_items",
+                     lambda: server.OrderCreate.model_validate(order_payload))
+
+        email_order = make_order(1, [make_cart_item(i) for i in range(EMAIL_ITEMS)])
+        self.measure("email_order_confirmation", lambda: generate_order_confirmation_email(email_order))
+        self.measure("email_status_update", lambda: generate_status_update_email(email_order, "processing"))
+        self.measure("email_admin_notification", lambda: generate_admin_notification_email(email_order))
+
+        products = [make_product(i) for i in range(LIST_SIZE)]
+        orders = [make_order(i, [make_cart_item(j) for j in range(5)]) for i in range(LIST_SIZE)]
+        self.measure(f"serialize_{LIST_SIZE}_products", lambda: JSONResponse(jsonable_encoder(products)).body)
+        self.measure(f"serialize_{LIST_SIZE}_orders", lambda: JSONResponse(jsonable_encoder(orders)).body)
+
+        self.loop.run_until_complete(self.db.products.insert_many([dict(p) for p in products[:REORDER_UPDATES]]))
+        updates = {"updates": [{"id": p["id"], "sort_order": REORDER_UPDATES - i}
+                               for i, p in enumerate(products[:REORDER_UPDATES])]}
+        self.measure(f"reorder_products_{REORDER_UPDATES}",
+                     lambda: server.reorder_products(updates, admin), is_async=True)
+        return self.results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        change = (current["median_us"] - before["median_us"]) / before["median_us"] * 100
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"   {name:<36} {before['median_us']:>12.2f} -> {current['median_us']:>12.2f} µs ({change:+.1f}%) {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for server hot paths")
+    parser.add_argument("--mongo-url", help="Local MongoDB to use instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="laundry_benchmark")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per round")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=25.0, help="Allowed median slowdown in percent")
+    args = parser.parse_args()
+
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    import server
+
+    loop = asyncio.new_event_loop()
+    if args.mongo_url:
+        db = server.db
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("Without --mongo-url the benchmarks need mongomock-motor: pip install mongomock-motor")
+        db = AsyncMongoMockClient()[args.db_name]
+        server.db = db
+        server.cache_bus.db = db
+        server.job_queue.db = db
+        server.payment_events.db = db
+    for collection in ("users", "products"):
+        loop.run_until_complete(db[collection].delete_many({}))
+
+    print("⏱  Running benchmarks")
+    results = BenchmarkSuite(server, db, loop, args.rounds, args.min_time).run()
+    loop.close()
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "benchmarks": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with baseline from {baseline.get('timestamp')} (threshold {args.threshold:.0f}%)")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
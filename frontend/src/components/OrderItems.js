@@ -0,0 +1,50 @@
+import React, { useState } from 'react';
+import { ChevronDown, ChevronUp } from 'lucide-react';
+import api from '../utils/api';
+import { toast } from 'sonner';
+
+// Order lists only carry an item count; line items are fetched when the customer expands the order
+export const OrderItems = ({ orderId, itemCount }) => {
+  const [items, setItems] = useState(null);
+  const [expanded, setExpanded] = useState(false);
+  const [loading, setLoading] = useState(false);
+
+  const toggle = async () => {
+    if (!expanded && items === null) {
+      setLoading(true);
+      try {
+        const response = await api.get(`/orders/${orderId}`);
+        setItems(response.data.items);
+      } catch (error) {
+        toast.error('Failed to load order items');
+        return;
+      } finally {
+        setLoading(false);
+      }
+    }
+    setExpanded(!expanded);
+  };
+
+  return (
+    <div className="border-t border-slate-200 pt-4 mb-4">
+      <button
+        onClick={toggle}
+        disabled={loading}
+        className="flex items-center gap-1 text-sm font-medium text-slate-700 mb-2 hover:text-blue-600"
+        data-testid={`order-items-toggle-${orderId}`}
+      >
+        Order Items ({itemCount})
+        {expanded ? <ChevronUp className="h-4 w-4" /> : <ChevronDown className="h-4 w-4" />}
+      </button>
+      {expanded && items && (
+        <div className="space-y-1">
+          {items.map((item, index) => (
+            <div key={index} className="text-sm text-slate-600">
+              • {item.product_name} × {item.quantity} - £{(item.price * item.quantity).toFixed(2)}
+            </div>
+          ))}
+        </div>
+      )}
+    </div>
+  );
+};
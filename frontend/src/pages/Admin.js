@@ -11,10 +11,17 @@ import {
   SelectValue,
 } from '../components/ui/select';
 import { ProductManagement } from './ProductManagement';
+import { OrderItems } from '../components/OrderItems';
 import api from '../utils/api';
 import { toast } from 'sonner';
 import { getUser } from '../utils/auth';
 
+// Only the columns the orders table renders
+const ADMIN_ORDER_FIELDS = [
+  'order_number', 'user_name', 'user_email', 'total_amount', 'status', 'item_count',
+  'pickup_date', 'pickup_time', 'delivery_date', 'delivery_time',
+].join(',');
+
 export const Admin = () => {
   const [stats, setStats] = useState(null);
   const [orders, setOrders] = useState([]);
@@ -44,7 +51,7 @@ export const Admin = () => {
 
   const loadOrders = async () => {
     try {
-      const response = await api.get('/admin/orders');
+      const response = await api.get('/admin/orders', { params: { fields: ADMIN_ORDER_FIELDS } });
       setOrders(response.data);
     } catch (error) {
       toast.error('Failed to load orders');
@@ -82,7 +89,10 @@ export const Admin = () => {
       toast.success('Order status updated');
       loadOrders();
     } catch (error) {
-      toast.error('Failed to update order status');
+      toast.error(error.response?.data?.detail || 'Failed to update order status');
+      if (error.response?.status === 409) {
+        loadOrders();
+      }
     }
   };
 
@@ -148,16 +158,7 @@ export const Admin = () => {
                   </div>
                 </div>
                 
-                <div className="border-t border-slate-200 pt-4 mb-4">
-                  <h4 className="text-sm font-medium text-slate-700 mb-2">Order Items:</h4>
-                  <div className="space-y-1">
-                    {order.items.map((item, index) => (
-                      <div key={index} className="text-sm text-slate-600">
-                        • {item.product_name} × {item.quantity} - £{(item.price * item.quantity).toFixed(2)}
-                      </div>
-                    ))}
-                  </div>
-                </div>
+                <OrderItems orderId={order.id} itemCount={order.item_count} />
                 
                 <div className="grid grid-cols-2 gap-4 text-sm">
                   <div>
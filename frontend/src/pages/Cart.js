@@ -37,7 +37,10 @@ export const Cart = () => {
 
   const totalAmount = cart.reduce((sum, item) => sum + item.price * item.quantity, 0);
   const minOrder = 0; // Temporarily set to 0 for testing (was 30)
-  const canCheckout = totalAmount >= minOrder;
+  const meetsMinimum = totalAmount >= minOrder;
+  // Each order goes to a single business; carts saved before this was enforced may mix them
+  const mixedBusinesses = new Set(cart.map(item => item.business_id)).size > 1;
+  const canCheckout = meetsMinimum && !mixedBusinesses;
 
   return (
     <div className="min-h-screen bg-slate-50" data-testid="cart-page">
@@ -116,7 +119,15 @@ export const Cart = () => {
                 <span className="text-2xl font-bold text-blue-600" data-testid="cart-total">£{totalAmount.toFixed(2)}</span>
               </div>
 
-              {!canCheckout && (
+              {mixedBusinesses && (
+                <div className="mb-4 p-4 bg-amber-50 border border-amber-200 rounded-xl" data-testid="mixed-business-warning">
+                  <p className="text-sm text-amber-800">
+                    Orders are placed with one business at a time. Remove items so your cart only has items from one business to checkout.
+                  </p>
+                </div>
+              )}
+
+              {!meetsMinimum && (
                 <div className="mb-4 p-4 bg-amber-50 border border-amber-200 rounded-xl" data-testid="minimum-order-warning">
                   <p className="text-sm text-amber-800">
                     Minimum order value is £{minOrder.toFixed(2)}. Add £{(minOrder - totalAmount).toFixed(2)} more to checkout.
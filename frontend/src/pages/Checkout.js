@@ -112,8 +112,8 @@ const CheckoutForm = () => {
         }
 
         if (paymentIntent.status === 'succeeded') {
-          // Create order after successful payment
-          const response = await api.post('/orders', orderData);
+          // Create order after successful payment; the Stripe webhook marks it paid via the intent id
+          const response = await api.post('/orders', { ...orderData, payment_intent_id: paymentIntent.id });
           toast.success('Payment successful! Order placed.');
           localStorage.removeItem('cart');
           navigate(`/order-confirmation/${response.data.order_id}`);
@@ -1,20 +1,24 @@
 import React, { useEffect, useState } from 'react';
 import { Package, Clock } from 'lucide-react';
+import { OrderItems } from '../components/OrderItems';
 import api from '../utils/api';
 import { toast } from 'sonner';
 
 export const Dashboard = () => {
-  const [orders, setOrders] = useState([]);
+  const [history, setHistory] = useState(null);
+  const [allOrders, setAllOrders] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingAll, setLoadingAll] = useState(false);
 
   useEffect(() => {
-    loadOrders();
+    loadHistory();
   }, []);
 
-  const loadOrders = async () => {
+  // One summary document: counts, active orders and the most recent orders
+  const loadHistory = async () => {
     try {
-      const response = await api.get('/orders');
-      setOrders(response.data);
+      const response = await api.get('/orders/history');
+      setHistory(response.data);
     } catch (error) {
       toast.error('Failed to load orders');
     } finally {
@@ -22,6 +26,18 @@ export const Dashboard = () => {
     }
   };
 
+  const loadAllOrders = async () => {
+    setLoadingAll(true);
+    try {
+      const response = await api.get('/orders');
+      setAllOrders(response.data);
+    } catch (error) {
+      toast.error('Failed to load orders');
+    } finally {
+      setLoadingAll(false);
+    }
+  };
+
   const getStatusColor = (status) => {
     const colors = {
       pending: 'bg-blue-50 text-blue-700 border-blue-200',
@@ -33,6 +49,65 @@ export const Dashboard = () => {
     return colors[status] || colors.pending;
   };
 
+  const renderOrder = (order) => (
+    <div
+      key={order.id}
+      className="bg-white rounded-2xl p-6 border border-slate-200"
+      data-testid={`order-${order.id}`}
+    >
+      <div className="flex justify-between items-start mb-4">
+        <div>
+          <h3 className="text-xl font-semibold mb-2" data-testid={`order-id-${order.id}`}>Order #{order.order_number || order.id.slice(0, 8)}</h3>
+          <p className="text-sm text-slate-600">
+            {new Date(order.created_at).toLocaleDateString('en-GB', {
+              day: 'numeric',
+              month: 'long',
+              year: 'numeric',
+            })}
+          </p>
+        </div>
+        <div>
+          <span
+            className={`inline-block px-4 py-2 rounded-full text-sm font-medium border ${getStatusColor(order.status)}`}
+            data-testid={`order-status-${order.id}`}
+          >
+            {order.status}
+          </span>
+        </div>
+      </div>
+
+      <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
+        <div className="flex items-center gap-2">
+          <Clock className="h-4 w-4 text-slate-400" />
+          <span className="text-sm text-slate-600">
+            Pickup: {order.pickup_date} at {order.pickup_time}
+          </span>
+        </div>
+        <div className="flex items-center gap-2">
+          <Clock className="h-4 w-4 text-slate-400" />
+          <span className="text-sm text-slate-600">
+            Delivery: {order.delivery_date} at {order.delivery_time}
+          </span>
+        </div>
+      </div>
+
+      <OrderItems orderId={order.id} itemCount={order.item_count} />
+
+      <div className="border-t border-slate-200 pt-4">
+        <div className="flex justify-between items-center">
+          <span className="text-slate-600">Total</span>
+          <span className="text-xl font-bold text-blue-600" data-testid={`order-amount-${order.id}`}>
+            £{order.total_amount.toFixed(2)}
+          </span>
+        </div>
+      </div>
+    </div>
+  );
+
+  // Active orders are listed on their own, so the recent list skips them
+  const activeIds = new Set(history ? history.active.map(order => order.id) : []);
+  const pastOrders = history ? history.recent.filter(order => !activeIds.has(order.id)) : [];
+
   if (loading) {
     return (
       <div className="min-h-screen bg-slate-50 flex items-center justify-center">
@@ -46,77 +121,67 @@ export const Dashboard = () => {
       <div className="max-w-6xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
         <h1 className="text-3xl md:text-5xl font-semibold tracking-tight mb-8">My Orders</h1>
 
-        {orders.length === 0 ? (
+        {!history || history.order_count === 0 ? (
           <div className="text-center py-16" data-testid="no-orders">
             <Package className="h-16 w-16 text-slate-300 mx-auto mb-4" />
             <p className="text-slate-600">No orders yet</p>
           </div>
         ) : (
-          <div className="space-y-6" data-testid="orders-list">
-            {orders.map(order => (
-              <div
-                key={order.id}
-                className="bg-white rounded-2xl p-6 border border-slate-200"
-                data-testid={`order-${order.id}`}
-              >
-                <div className="flex justify-between items-start mb-4">
-                  <div>
-                    <h3 className="text-xl font-semibold mb-2" data-testid={`order-id-${order.id}`}>Order #{order.order_number || order.id.slice(0, 8)}</h3>
-                    <p className="text-sm text-slate-600">
-                      {new Date(order.created_at).toLocaleDateString('en-GB', {
-                        day: 'numeric',
-                        month: 'long',
-                        year: 'numeric',
-                      })}
-                    </p>
-                  </div>
-                  <div>
-                    <span
-                      className={`inline-block px-4 py-2 rounded-full text-sm font-medium border ${getStatusColor(order.status)}`}
-                      data-testid={`order-status-${order.id}`}
-                    >
-                      {order.status}
-                    </span>
-                  </div>
-                </div>
-
-                <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
-                  <div className="flex items-center gap-2">
-                    <Clock className="h-4 w-4 text-slate-400" />
-                    <span className="text-sm text-slate-600">
-                      Pickup: {order.pickup_date} at {order.pickup_time}
-                    </span>
-                  </div>
-                  <div className="flex items-center gap-2">
-                    <Clock className="h-4 w-4 text-slate-400" />
-                    <span className="text-sm text-slate-600">
-                      Delivery: {order.delivery_date} at {order.delivery_time}
-                    </span>
-                  </div>
-                </div>
-
-                <div className="border-t border-slate-200 pt-4 mb-4">
-                  <h4 className="text-sm font-medium text-slate-700 mb-2">Order Items:</h4>
-                  <div className="space-y-1">
-                    {order.items.map((item, index) => (
-                      <div key={index} className="text-sm text-slate-600">
-                        • {item.product_name} × {item.quantity} - £{(item.price * item.quantity).toFixed(2)}
-                      </div>
-                    ))}
-                  </div>
-                </div>
+          <>
+            <div className="grid grid-cols-1 sm:grid-cols-3 gap-4 mb-8" data-testid="order-history-summary">
+              <div className="bg-white rounded-2xl p-6 border border-slate-200">
+                <p className="text-sm text-slate-600">Orders placed</p>
+                <p className="text-2xl font-semibold" data-testid="order-count">{history.order_count}</p>
+              </div>
+              <div className="bg-white rounded-2xl p-6 border border-slate-200">
+                <p className="text-sm text-slate-600">Active orders</p>
+                <p className="text-2xl font-semibold" data-testid="active-order-count">{history.active.length}</p>
+              </div>
+              <div className="bg-white rounded-2xl p-6 border border-slate-200">
+                <p className="text-sm text-slate-600">Total spent</p>
+                <p className="text-2xl font-semibold text-blue-600" data-testid="lifetime-spend">
+                  £{history.lifetime_spend.toFixed(2)}
+                </p>
+              </div>
+            </div>
 
-                <div className="border-t border-slate-200 pt-4">
-                  <div className="flex justify-between items-center">
-                    <span className="text-slate-600">Total</span>
-                    <span className="text-xl font-bold text-blue-600" data-testid={`order-amount-${order.id}`}>
-                      £{order.total_amount.toFixed(2)}
-                    </span>
-                  </div>
-                </div>
+            {allOrders ? (
+              <div className="space-y-6" data-testid="orders-list">
+                {allOrders.map(renderOrder)}
               </div>
-            ))}
-          </div>
+            ) : (
+              <>
+                {history.active.length > 0 && (
+                  <>
+                    <h2 className="text-xl font-semibold mb-4">Active Orders</h2>
+                    <div className="space-y-6 mb-8" data-testid="active-orders-list">
+                      {history.active.map(renderOrder)}
+                    </div>
+                  </>
+                )}
+                {pastOrders.length > 0 && (
+                  <>
+                    <h2 className="text-xl font-semibold mb-4">Recent Orders</h2>
+                    <div className="space-y-6" data-testid="orders-list">
+                      {pastOrders.map(renderOrder)}
+                    </div>
+                  </>
+                )}
+                {history.order_count > history.active.length + pastOrders.length && (
+                  <div className="text-center mt-8">
+                    <button
+                      onClick={loadAllOrders}
+                      disabled={loadingAll}
+                      className="px-6 py-2 rounded-full border border-slate-300 text-sm font-medium text-slate-700 hover:bg-slate-100"
+                      data-testid="view-all-orders"
+                    >
+                      {loadingAll ? 'Loading...' : 'View all orders'}
+                    </button>
+                  </div>
+                )}
+              </>
+            )}
+          </>
         )}
       </div>
     </div>
@@ -19,7 +19,7 @@ export const Login = () => {
 
     try {
       const response = await api.post('/auth/login', { email, password });
-      setAuth(response.data.token, response.data.user);
+      setAuth(response.data.token, response.data.user, response.data.refresh_token);
       toast.success('Login successful!');
       
       if (response.data.user.role.includes('admin')) {
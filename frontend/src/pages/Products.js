@@ -8,10 +8,11 @@ import { toast } from 'sonner';
 import { isAuthenticated } from '../utils/auth';
 
 export const Products = () => {
-  const [products, setProducts] = useState([]);
   const [categories, setCategories] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('');
   const [expandedSubcategories, setExpandedSubcategories] = useState({});
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState([]);
   const [cart, setCart] = useState([]);
   const [pinCode, setPinCode] = useState('');
   const [hasValidPinCode, setHasValidPinCode] = useState(false);
@@ -24,7 +25,7 @@ export const Products = () => {
     if (savedPinCode) {
       setPinCode(savedPinCode);
       setHasValidPinCode(true);
-      loadCategories();
+      loadCatalog();
     }
     
     const savedCart = localStorage.getItem('cart');
@@ -34,10 +35,20 @@ export const Products = () => {
   }, []);
 
   useEffect(() => {
-    if (selectedCategory && hasValidPinCode) {
-      loadProducts();
+    if (!searchQuery.trim()) {
+      setSearchResults([]);
+      return;
     }
-  }, [selectedCategory, hasValidPinCode]);
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.get('/products/search', { params: { q: searchQuery, limit: 20 } });
+        setSearchResults(response.data);
+      } catch (error) {
+        console.error('Search failed:', error);
+      }
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
 
   const checkPinCode = async () => {
     if (!pinCode || pinCode.length < 3) {
@@ -53,7 +64,7 @@ export const Products = () => {
         sessionStorage.setItem('pinCode', pinCode.toUpperCase());
         sessionStorage.setItem('businesses', JSON.stringify(response.data.businesses));
         setHasValidPinCode(true);
-        loadCategories();
+        loadCatalog();
       } else {
         toast.error('Service not available in your area yet');
         setHasValidPinCode(false);
@@ -65,33 +76,34 @@ export const Products = () => {
     }
   };
 
-  const loadCategories = async () => {
+  const loadCatalog = async () => {
     try {
-      const response = await api.get('/categories');
-      setCategories(response.data);
-      if (response.data.length > 0) {
-        setSelectedCategory(response.data[0].name);
+      // One cached request returns every category, already grouped and sorted
+      const response = await api.get('/catalog/tree');
+      const merged = [];
+      response.data.service_types.forEach(serviceType => {
+        serviceType.categories.forEach(category => {
+          const existing = merged.find(cat => cat.name === category.name);
+          if (existing) {
+            existing.subcategories.push(...category.subcategories);
+          } else {
+            merged.push({ name: category.name, subcategories: [...category.subcategories] });
+          }
+        });
+      });
+      setCategories(merged);
+      if (merged.length > 0) {
+        selectCategory(merged[0]);
       }
     } catch (error) {
-      toast.error('Failed to load categories');
+      toast.error('Failed to load products');
     }
   };
 
-  const loadProducts = async () => {
-    try {
-      const response = await api.get(`/products?category=${encodeURIComponent(selectedCategory)}`);
-      console.log(`Loaded ${response.data.length} products for category: ${selectedCategory}`);
-      setProducts(response.data);
-      if (response.data.length > 0) {
-        const firstSubcategory = response.data[0].subcategory;
-        if (firstSubcategory) {
-          setExpandedSubcategories({ [firstSubcategory]: true });
-        }
-      }
-    } catch (error) {
-      console.error('Failed to load products:', error);
-      toast.error('Failed to load products');
-    }
+  const selectCategory = (category) => {
+    setSelectedCategory(category.name);
+    const firstSubcategory = category.subcategories[0];
+    setExpandedSubcategories(firstSubcategory ? { [firstSubcategory.name || 'Other']: true } : {});
   };
 
   const toggleSubcategory = (subcategory) => {
@@ -103,29 +115,43 @@ export const Products = () => {
 
   const groupBySubcategory = () => {
     const grouped = {};
-    products.forEach(product => {
-      const key = product.subcategory || 'Other';
-      if (!grouped[key]) {
-        grouped[key] = [];
-      }
-      grouped[key].push(product);
+    const category = categories.find(cat => cat.name === selectedCategory);
+    (category ? category.subcategories : []).forEach(subcategory => {
+      const key = subcategory.name || 'Other';
+      grouped[key] = [
+        ...(grouped[key] || []),
+        ...subcategory.products.map(product => ({
+          ...product,
+          category: category.name,
+          subcategory: subcategory.name,
+        })),
+      ];
     });
     return grouped;
   };
 
   const addToCart = (product) => {
-    const existingItem = cart.find(item => item.product_id === product.id);
+    let currentCart = cart;
+    // Orders go to a single business, so a cart can only hold one business's items
+    if (currentCart.length > 0 && currentCart[0].business_id !== product.business_id) {
+      if (!window.confirm(`Your cart has items from ${currentCart[0].business_name}. Orders are placed with one business at a time. Clear your cart and add this item?`)) {
+        return;
+      }
+      currentCart = [];
+    }
+
+    const existingItem = currentCart.find(item => item.product_id === product.id);
     let updatedCart;
     
     if (existingItem) {
-      updatedCart = cart.map(item =>
+      updatedCart = currentCart.map(item =>
         item.product_id === product.id
           ? { ...item, quantity: item.quantity + 1 }
           : item
       );
     } else {
       updatedCart = [
-        ...cart,
+        ...currentCart,
         {
           product_id: product.id,
           product_name: product.name,
@@ -153,6 +179,43 @@ export const Products = () => {
     navigate('/cart');
   };
 
+  const renderProduct = (product) => (
+    <div
+      key={product.id}
+      className="flex items-center justify-between p-6 border-b border-slate-200 last:border-b-0 hover:bg-slate-50"
+      data-testid={`product-${product.id}`}
+    >
+      <div className="flex items-center gap-4 flex-1">
+        <div className="w-16 h-16 bg-slate-100 rounded-lg flex items-center justify-center">
+          <svg className="w-10 h-10 text-slate-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+            <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={1.5} d="M7 7h.01M7 3h5c.512 0 1.024.195 1.414.586l7 7a2 2 0 010 2.828l-7 7a2 2 0 01-2.828 0l-7-7A1.994 1.994 0 013 12V7a4 4 0 014-4z" />
+          </svg>
+        </div>
+        <div>
+          <h3 className="font-medium text-slate-900" data-testid={`product-name-${product.id}`}>
+            {product.name}
+          </h3>
+          {product.subcategory && (
+            <p className="text-sm text-slate-500">{product.subcategory}</p>
+          )}
+        </div>
+      </div>
+
+      <div className="flex items-center gap-4">
+        <div className="bg-green-500 text-white font-bold rounded-lg px-6 py-3" data-testid={`product-price-${product.id}`}>
+          £{product.price.toFixed(2)}
+        </div>
+        <Button
+          onClick={() => addToCart(product)}
+          className="bg-blue-600 hover:bg-blue-700 rounded-lg"
+          data-testid={`add-to-cart-${product.id}`}
+        >
+          <ShoppingCart className="h-5 w-5" />
+        </Button>
+      </div>
+    </div>
+  );
+
   const totalItems = cart.reduce((sum, item) => sum + item.quantity, 0);
   const groupedProducts = groupBySubcategory();
 
@@ -200,7 +263,7 @@ export const Products = () => {
                       sessionStorage.removeItem('pinCode');
                       setHasValidPinCode(false);
                       setPinCode('');
-                      setProducts([]);
+                      setCategories([]);
                     }}
                     className="ml-3 text-sm text-blue-600 hover:underline"
                     data-testid="change-postcode"
@@ -211,81 +274,71 @@ export const Products = () => {
               </div>
             </div>
 
-            {/* Category Tabs */}
-            <div className="flex flex-wrap justify-center gap-3 mb-8">
-              {categories.map(cat => (
-                <Button
-                  key={cat.name}
-                  onClick={() => setSelectedCategory(cat.name)}
-                  variant={selectedCategory === cat.name ? "default" : "outline"}
-                  className={selectedCategory === cat.name ? "bg-blue-600 hover:bg-blue-700 text-white border-blue-600" : "border-slate-300 hover:bg-slate-50"}
-                  data-testid={`category-${cat.name}`}
-                >
-                  {cat.name}
-                </Button>
-              ))}
+            {/* Product Search */}
+            <div className="relative max-w-md mx-auto mb-6">
+              <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-5 w-5 text-slate-400" />
+              <Input
+                type="text"
+                placeholder="Search items, e.g. duvet cover"
+                value={searchQuery}
+                onChange={(e) => setSearchQuery(e.target.value)}
+                className="h-12 pl-10"
+                data-testid="product-search-input"
+              />
             </div>
 
-            {/* Products List (grouped by subcategory) */}
-            <div className="space-y-4" data-testid="products-list">
-              {Object.entries(groupedProducts).map(([subcategory, subcategoryProducts]) => (
-                <div key={subcategory} className="bg-white rounded-lg border border-slate-200 overflow-hidden">
-                  <button
-                    onClick={() => toggleSubcategory(subcategory)}
-                    className="w-full flex items-center justify-between p-6 hover:bg-slate-50 transition-colors"
-                    data-testid={`subcategory-toggle-${subcategory}`}
-                  >
-                    <h2 className="text-xl font-semibold text-slate-800">{subcategory}</h2>
-                    {expandedSubcategories[subcategory] ? (
-                      <ChevronUp className="h-6 w-6 text-blue-600" />
-                    ) : (
-                      <ChevronDown className="h-6 w-6 text-blue-600" />
-                    )}
-                  </button>
+            {searchQuery.trim() ? (
+              <div className="bg-white rounded-lg border border-slate-200 overflow-hidden" data-testid="search-results">
+                {searchResults.length > 0 ? (
+                  searchResults.map(renderProduct)
+                ) : (
+                  <p className="p-6 text-slate-500">No items match "{searchQuery}"</p>
+                )}
+              </div>
+            ) : (
+              <>
+                {/* Category Tabs */}
+                <div className="flex flex-wrap justify-center gap-3 mb-8">
+                  {categories.map(cat => (
+                    <Button
+                      key={cat.name}
+                      onClick={() => selectCategory(cat)}
+                      variant={selectedCategory === cat.name ? "default" : "outline"}
+                      className={selectedCategory === cat.name ? "bg-blue-600 hover:bg-blue-700 text-white border-blue-600" : "border-slate-300 hover:bg-slate-50"}
+                      data-testid={`category-${cat.name}`}
+                    >
+                      {cat.name}
+                    </Button>
+                  ))}
+                </div>
 
-                  {expandedSubcategories[subcategory] && (
-                    <div className="border-t border-slate-200">
-                      {subcategoryProducts.map(product => (
-                        <div
-                          key={product.id}
-                          className="flex items-center justify-between p-6 border-b border-slate-200 last:border-b-0 hover:bg-slate-50"
-                          data-testid={`product-${product.id}`}
-                        >
-                          <div className="flex items-center gap-4 flex-1">
-                            <div className="w-16 h-16 bg-slate-100 rounded-lg flex items-center justify-center">
-                              <svg className="w-10 h-10 text-slate-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={1.5} d="M7 7h.01M7 3h5c.512 0 1.024.195 1.414.586l7 7a2 2 0 010 2.828l-7 7a2 2 0 01-2.828 0l-7-7A1.994 1.994 0 013 12V7a4 4 0 014-4z" />
-                              </svg>
-                            </div>
-                            <div>
-                              <h3 className="font-medium text-slate-900" data-testid={`product-name-${product.id}`}>
-                                {product.name}
-                              </h3>
-                              {product.subcategory && (
-                                <p className="text-sm text-slate-500">{product.subcategory}</p>
-                              )}
-                            </div>
-                          </div>
+                {/* Products List (grouped by subcategory) */}
+                <div className="space-y-4" data-testid="products-list">
+                  {Object.entries(groupedProducts).map(([subcategory, subcategoryProducts]) => (
+                    <div key={subcategory} className="bg-white rounded-lg border border-slate-200 overflow-hidden">
+                      <button
+                        onClick={() => toggleSubcategory(subcategory)}
+                        className="w-full flex items-center justify-between p-6 hover:bg-slate-50 transition-colors"
+                        data-testid={`subcategory-toggle-${subcategory}`}
+                      >
+                        <h2 className="text-xl font-semibold text-slate-800">{subcategory}</h2>
+                        {expandedSubcategories[subcategory] ? (
+                          <ChevronUp className="h-6 w-6 text-blue-600" />
+                        ) : (
+                          <ChevronDown className="h-6 w-6 text-blue-600" />
+                        )}
+                      </button>
 
-                          <div className="flex items-center gap-4">
-                            <div className="bg-green-500 text-white font-bold rounded-lg px-6 py-3" data-testid={`product-price-${product.id}`}>
-                              £{product.price.toFixed(2)}
-                            </div>
-                            <Button
-                              onClick={() => addToCart(product)}
-                              className="bg-blue-600 hover:bg-blue-700 rounded-lg"
-                              data-testid={`add-to-cart-${product.id}`}
-                            >
-                              <ShoppingCart className="h-5 w-5" />
-                            </Button>
-                          </div>
+                      {expandedSubcategories[subcategory] && (
+                        <div className="border-t border-slate-200">
+                          {subcategoryProducts.map(renderProduct)}
                         </div>
-                      ))}
+                      )}
                     </div>
-                  )}
+                  ))}
                 </div>
-              ))}
-            </div>
+              </>
+            )}
           </>
         )}
 
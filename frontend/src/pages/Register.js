@@ -27,7 +27,7 @@ export const Register = () => {
 
     try {
       const response = await api.post('/auth/register', formData);
-      setAuth(response.data.token, response.data.user);
+      setAuth(response.data.token, response.data.user, response.data.refresh_token);
       toast.success('Registration successful!');
       navigate('/services');
     } catch (error) {
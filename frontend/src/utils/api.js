@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { clearAuth, setAuth } from './auth';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
@@ -9,7 +10,6 @@ const api = axios.create({
 
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token');
-c
 
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
@@ -17,4 +17,44 @@ c
   return config;
 });
 
+// Access tokens are short-lived; concurrent 401s share one refresh request
+let refreshing = null;
+
+const refreshAccessToken = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = (refreshToken
+      ? axios.post(`${API_BASE}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        setAuth(response.data.token, response.data.user);
+        return response.data.token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status !== 401 || original._retried || original.url.startsWith('/auth/')) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      const token = await refreshAccessToken();
+      original.headers.Authorization = `Bearer ${token}`;
+      return api(original);
+    } catch (refreshError) {
+      clearAuth();
+      return Promise.reject(error);
+    }
+  }
+);
+
 export default api;
\ No newline at end of file
@@ -1,6 +1,9 @@
-export const setAuth = (token, user) => {
+export const setAuth = (token, user, refreshToken) => {
   localStorage.setItem('token', token);
   localStorage.setItem('user', JSON.stringify(user));
+  if (refreshToken) {
+    localStorage.setItem('refresh_token', refreshToken);
+  }
 };
 
 export const getAuth = () => {
@@ -15,6 +18,7 @@ export const getAuth = () => {
 export const clearAuth = () => {
   localStorage.removeItem('token');
   localStorage.removeItem('user');
+  localStorage.removeItem('refresh_token');
 };
 
 export const isAuthenticated = () => {
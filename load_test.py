@@ -0,0 +1,437 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+ADMIN_EMAIL = "loadtest-admin@laundry-express.co.uk"
+PASSWORD = "loadtest123"
+CATEGORIES = {
+    "Dry Cleaning": ["Shirts", "Tops", "Bottoms", "Suits", "Dresses", "Outerwear"],
+    "Wash & Iron": ["Shirts", "Tops", "Bottoms"],
+    "Ironing": ["Shirts", "Tops", "Bottoms"],
+    "Household & Bulk Laundry": ["Bedding", "Curtains", "Bags"],
+}
+PIN_CODES = ["CO1", "CO2", "CO3", "CO4", "CO5", "CO6", "CO7", "CM1", "CM2", "IP1", "IP2", "IP3"]
+STATUSES = ["completed"] * 14 + ["pending"] * 2 + ["confirmed"] + ["processing"] * 2 + ["cancelled"]
+
+# Weighted scenario mix replayed at the target rate
+SCENARIOS = {
+    "browse": 55,
+    "pincode": 20,
+    "checkout": 15,
+    "dashboard": 7,
+    "admin": 3,
+}
+
+
+def zipf_weights(n, s=1.1):
+    """Cumulative Zipf weights: a few popular items, a long tail of rare ones"""
+    total = 0.0
+    cumulative = []
+    for rank in range(1, n + 1):
+        total += 1 / rank ** s
+        cumulative.append(total)
+    return cumulative
+
+
+class SyntheticData:
+    """Generates businesses, products, users and orders with realistic skew"""
+
+    def __init__(self, businesses, products_per_business, users, orders, seed=42):
+        self.rng = random.Random(seed)
+        self.counts = {
+            "businesses": businesses,
+            "products_per_business": products_per_business,
+            "users": users,
+            "orders": orders,
+        }
+        self.businesses = []
+        self.products = []
+        self.users = []
+        self.product_weights = []
+
+    def build_businesses(self):
+        for i in range(self.counts["businesses"]):
+            self.businesses.append({
+                "id": str(uuid.uuid4()),
+                "name": f"Load Test Laundry {i + 1}",
+                "owner_email": f"owner{i + 1}@loadtest.example",
+                "pin_codes": self.rng.sample(PIN_CODES, self.rng.randint(2, 6)),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            })
+        return self.businesses
+
+    def build_products(self):
+        for business in self.businesses:
+            for i in range(self.counts["products_per_business"]):
+                category = self.rng.choice(list(CATEGORIES))
+                self.products.append({
+                    "id": str(uuid.uuid4()),
+                    "business_id": business["id"],
+                    "business_name": business["name"],
+                    "service_type": "Laundry Service",
+                    "category": category,
+                    "subcategory": self.rng.choice(CATEGORIES[category]),
+                    "name": f"Item {i + 1}",
+                    "price": round(self.rng.uniform(3, 40) * 2) / 2 - 0.05,
+                    "icon_url": None,
+                    "sort_order": i,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                })
+        self.product_weights = zipf_weights(len(self.products))
+        return self.products
+
+    def build_users(self, password_hash):
+        self.users = [{
+            "id": str(uuid.uuid4()),
+            "email": ADMIN_EMAIL,
+            "password": password_hash,
+            "name": "Load Test Admin",
+            "phone": "07000000000",
+            "role": "platform_admin",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }]
+        for i in range(self.counts["users"]):
+            self.users.append({
+                "id": str(uuid.uuid4()),
+                "email": f"customer{i + 1}@loadtest.example",
+                # Hashing is the slow part of seeding, so every customer shares one hash
+                "password": password_hash,
+                "name": f"Customer {i + 1}",
+                "phone": f"07{i:09d}",
+                "role": "customer",
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            })
+        return self.users
+
+    def random_items(self):
+        items = []
+        chosen = self.rng.choices(self.products, cum_weights=self.product_weights, k=self.rng.randint(1, 8))
+        # Every order is fulfilled by a single business
+        for product in chosen:
+            if product["business_id"] != chosen[0]["business_id"]:
+                continue
+            items.append({
+                "product_id": product["id"],
+                "product_name": product["name"],
+                "category": product["category"],
+                "subcategory": product["subcategory"],
+                "business_id": product["business_id"],
+                "business_name": product["business_name"],
+                "price": product["price"],
+                "quantity": self.rng.randint(1, 4),
+            })
+        return items
+
+    def iter_orders(self):
+        customers = self.users[1:]
+        # Repeat customers dominate: a minority of users place most orders
+        user_weights = zipf_weights(len(customers), s=0.8)
+        now = datetime.now(timezone.utc)
+        for i in range(self.counts["orders"]):
+            user = self.rng.choices(customers, cum_weights=user_weights)[0]
+            items = self.random_items()
+            created = now - timedelta(days=self.rng.expovariate(1 / 60), seconds=self.rng.randint(0, 86400))
+            pickup = created + timedelta(days=1)
+            yield {
+                "id": str(uuid.uuid4()),
+                "order_number": 100000 + i,
+                "user_id": user["id"],
+                "user_name": user["name"],
+                "user_email": user["email"],
+                "business_id": items[0]["business_id"],
+                "items": items,
+                "pickup_date": pickup.date().isoformat(),
+                "pickup_time": "09:00-11:00",
+                "pickup_instruction": "in-person",
+                "delivery_date": (pickup + timedelta(days=2)).date().isoformat(),
+                "delivery_time": "14:00-16:00",
+                "delivery_instruction": "ring-wait",
+                "address": f"{self.rng.randint(1, 200)} Test Street",
+                "pin_code": self.rng.choice(PIN_CODES) + " 1AB",
+                "payment_method": self.rng.choice(["cod", "stripe"]),
+                "payment_status": "cod",
+                "total_amount": round(sum(item["price"] * item["quantity"] for item in items), 2),
+                "status": self.rng.choice(STATUSES),
+                "created_at": created.isoformat(),
+            }
+
+    async def write(self, db, chunk_size=5000):
+        from passlib.context import CryptContext
+
+        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        password_hash = pwd_context.hash(PASSWORD)
+        for collection in ("businesses", "products", "users", "orders"):
+            await db[collection].delete_many({})
+        await db.businesses.insert_many(self.build_businesses())
+        for start in range(0, len(self.build_products()), chunk_size):
+            await db.products.insert_many(self.products[start:start + chunk_size])
+        await db.users.insert_many(self.build_users(password_hash))
+        batch = []
+        for order in self.iter_orders():
+            batch.append(order)
+            if len(batch) >= chunk_size:
+                await db.orders.insert_many(batch)
+                batch = []
+        if batch:
+            await db.orders.insert_many(batch)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class LoadRunner:
+    def __init__(self, client, data, rate, duration, concurrency, seed=7):
+        self.client = client
+        self.data = data
+        self.rate = rate
+        self.duration = duration
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rng = random.Random(seed)
+        self.latencies = {}
+        self.errors = {}
+        self.dropped = 0
+        self.customer_tokens = []
+        self.admin_token = None
+
+    async def request(self, label, method, url, token=None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed = (time.perf_counter() - start) * 1000
+        self.latencies.setdefault(label, []).append(elapsed)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response if ok else None
+
+    async def login_pool(self, size):
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                      json={"email": ADMIN_EMAIL, "password": PASSWORD})
+        if response is None:
+            raise RuntimeError("Admin login failed; was the dataset generated into the target database?")
+        self.admin_token = response.json()["token"]
+        for user in self.rng.sample(self.data.users[1:], min(size, len(self.data.users) - 1)):
+            response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                          json={"email": user["email"], "password": PASSWORD})
+            if response is not None:
+                self.customer_tokens.append(response.json()["token"])
+
+    async def browse(self):
+        # The products page loads every category in one cached request
+        await self.request("GET /api/catalog/tree", "GET", "/api/catalog/tree")
+
+    async def pincode(self):
+        await self.request("POST /api/pincode/check", "POST", "/api/pincode/check",
+                           json={"pin_code": self.rng.choice(PIN_CODES)})
+
+    async def checkout(self):
+        token = self.rng.choice(self.customer_tokens)
+        await self.request("POST /api/pincode/check", "POST", "/api/pincode/check",
+                           json={"pin_code": self.rng.choice(PIN_CODES)})
+        await self.request("GET /api/catalog/tree", "GET", "/api/catalog/tree")
+        items = self.data.random_items()
+        order = {
+            "items": items,
+            "pickup_date": datetime.now(timezone.utc).date().isoformat(),
+            "pickup_time": "09:00-11:00",
+            "pickup_instruction": "in-person",
+            "delivery_date": (datetime.now(timezone.utc) + timedelta(days=2)).date().isoformat(),
+            "delivery_time": "14:00-16:00",
+            "delivery_instruction": "ring-wait",
+            "address": "1 Load Test Street",
+            "pin_code": self.rng.choice(PIN_CODES),
+            "payment_method": "cod",
+            "total_amount": round(sum(item["price"] * item["quantity"] for item in items), 2),
+        }
+        await self.request("POST /api/orders", "POST", "/api/orders", token=token, json=order)
+
+    async def dashboard(self):
+        token = self.rng.choice(self.customer_tokens)
+        await self.request("GET /api/orders/history", "GET", "/api/orders/history", token=token)
+        # Some customers go on to open their full order list
+        if self.rng.random() < 0.2:
+            await self.request("GET /api/orders", "GET", "/api/orders", token=token)
+
+    async def admin(self):
+        await self.request("GET /api/admin/stats", "GET", "/api/admin/stats", token=self.admin_token)
+        await self.request("GET /api/admin/orders", "GET", "/api/admin/orders", token=self.admin_token)
+
+    async def _run_scenario(self, name):
+        try:
+            await getattr(self, name)()
+        finally:
+            self.semaphore.release()
+
+    async def run(self):
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        tasks = []
+        start = time.perf_counter()
+        next_arrival = start
+        # Open-loop Poisson arrivals: a slow server does not slow down the offered load
+        while next_arrival - start < self.duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.semaphore.locked():
+                self.dropped += 1
+            else:
+                await self.semaphore.acquire()
+                scenario = self.rng.choices(names, weights=weights)[0]
+                tasks.append(asyncio.create_task(self._run_scenario(scenario)))
+            next_arrival += self.rng.expovariate(self.rate)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed):
+        endpoints = {}
+        total = 0
+        for label, values in sorted(self.latencies.items()):
+            values.sort()
+            total += len(values)
+            endpoints[label] = {
+                "count": len(values),
+                "errors": self.errors.get(label, 0),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "max_ms": round(values[-1], 2),
+            }
+        return {"elapsed_s": round(elapsed, 2), "requests": total,
+                "achieved_rps": round(total / elapsed, 1) if elapsed else 0,
+                "dropped_arrivals": self.dropped, "endpoints": endpoints}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, previous=None):
+    print(f"\n📊 Load Test Summary ({results['commit'] or 'unknown commit'})")
+    print(f"   Requests: {results['requests']} in {results['elapsed_s']}s "
+          f"({results['achieved_rps']} rps, {results['dropped_arrivals']} arrivals dropped)")
+    print(f"\n   {'endpoint':<28} {'count':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, stats in results["endpoints"].items():
+        line = (f"   {label:<28} {stats['count']:>7} {stats['errors']:>5} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+        before = (previous or {}).get("endpoints", {}).get(label)
+        if before:
+            change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+            line += f"   p95 {change:+.1f}% vs {previous.get('commit')}"
+        print(line)
+
+
+async def main_async(args):
+    if args.in_memory:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    else:
+        os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("JWT_SECRET", "load-test-secret")
+
+    data = SyntheticData(args.businesses, args.products, args.users, args.orders, seed=args.seed)
+
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+        db = AsyncMongoMockClient()[args.db_name]
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        db = AsyncIOMotorClient(args.mongo_url)[args.db_name]
+
+    print(f"Generating {args.businesses} businesses, {args.businesses * args.products} products, "
+          f"{args.users} users and {args.orders} orders into {args.db_name}...")
+    await data.write(db)
+
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        # Never send real emails for synthetic orders
+        os.environ["RESEND_API_KEY"] = ""
+        import server
+        from indexes import ensure_indexes
+
+        server.db = db
+        server.cache_bus.db = db
+        server.job_queue.db = db
+        server.payment_events.db = db
+        await ensure_indexes(db)
+        transport, base_url = httpx.ASGITransport(app=server.app), "http://loadtest"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=30) as client:
+        runner = LoadRunner(client, data, args.rps, args.duration, args.concurrency, seed=args.seed)
+        await runner.login_pool(args.login_pool)
+        runner.latencies.clear()
+        runner.errors.clear()
+        print(f"Replaying scenario mix at {args.rps} rps for {args.duration}s...")
+        elapsed = await runner.run()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "scenarios": SCENARIOS,
+        **runner.report(elapsed),
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(results, previous)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic data and replay a traffic mix against the API")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="laundry_load_test",
+                        help="Dedicated database; its collections are wiped before generating data")
+    parser.add_argument("--in-memory", action="store_true", help="Use mongomock-motor instead of MongoDB")
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--businesses", type=int, default=5)
+    parser.add_argument("--products", type=int, default=200, help="Products per business")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--concurrency", type=int, default=200, help="Max scenarios in flight")
+    parser.add_argument("--login-pool", type=int, default=20, help="Customers logged in before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="Previous results file to compare p95 against")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from jobs import CronSchedule, JobQueue, JobWorker
+
+
+def _at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+
+
+def test_cron_next_after():
+    assert CronSchedule("*/15 * * * *").next_after(_at("2026-03-01 10:07")) == _at("2026-03-01 10:15")
+    assert CronSchedule("0 3 * * *").next_after(_at("2026-03-01 03:00")) == _at("2026-03-02 03:00")
+    assert CronSchedule("30 2 1 * *").next_after(_at("2026-12-15 00:00")) == _at("2027-01-01 02:30")
+    # Monday to Friday only; 2026-03-07 is a Saturday
+    assert CronSchedule("0 9 * * 1-5").next_after(_at("2026-03-06 10:00")) == _at("2026-03-09 09:00")
+    # 7 is Sunday as well as 0
+    assert CronSchedule("0 0 * * 7").next_after(_at("2026-03-06 10:00")) == _at("2026-03-08 00:00")
+
+
+def test_cron_day_of_month_or_weekday():
+    # Restricting both fires on either: the 10th, or any Sunday
+    cron = CronSchedule("0 0 10 * 0")
+    assert cron.next_after(_at("2026-03-01 00:00")) == _at("2026-03-08 00:00")
+    assert cron.next_after(_at("2026-03-08 00:00")) == _at("2026-03-10 00:00")
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* * 0 * *", "5-1 * * * *", "a * * * *"])
+def test_cron_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_registration_rejects_expressions_that_never_fire():
+    queue = JobQueue(AsyncMongoMockClient()["test"])
+    with pytest.raises(ValueError, match="never fires"):
+        queue.cron("archive", "0 0 31 2 *", "archive")
+    assert queue.schedules == {}
+
+
+async def _noop(payload):
+    pass
+
+
+def _queue(**options):
+    queue = JobQueue(AsyncMongoMockClient()["test"])
+    queue.job("email", **options)(_noop)
+    return queue
+
+
+def _running(job_id, attempts, lease_until, worker="dead-worker"):
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    return {"_id": job_id, "type": "email", "payload": {}, "status": "running", "attempts": attempts,
+            "run_at": past, "lease_until": lease_until, "worker": worker}
+
+
+def test_fail_abandoned_fails_only_exhausted_expired_jobs():
+    async def run():
+        queue = _queue(max_attempts=3)
+        now = datetime.now(timezone.utc)
+        await queue.jobs.insert_many([
+            _running("exhausted", 3, now - timedelta(seconds=1)),
+            _running("retryable", 2, now - timedelta(seconds=1)),
+            _running("still-leased", 3, now + timedelta(minutes=1)),
+        ])
+        failed = await queue.fail_abandoned(queue.types["email"])
+        statuses = {job["_id"]: job["status"] async for job in queue.jobs.find({})}
+        claimed = await queue.claim(queue.types["email"], "worker-1")
+        return failed, statuses, claimed
+
+    failed, statuses, claimed = asyncio.run(run())
+    assert failed == 1
+    assert statuses == {"exhausted": "failed", "retryable": "running", "still-leased": "running"}
+    assert claimed["_id"] == "retryable" and claimed["attempts"] == 3
+
+
+def test_claim_skips_expired_jobs_out_of_attempts():
+    async def run():
+        queue = _queue(max_attempts=3)
+        await queue.jobs.insert_one(_running("exhausted", 3, datetime.now(timezone.utc) - timedelta(seconds=1)))
+        return await queue.claim(queue.types["email"], "worker-1")
+
+    assert asyncio.run(run()) is None
+
+
+def test_failed_job_is_retried_with_backoff_then_failed():
+    async def failing(payload):
+        raise RuntimeError("smtp down")
+
+    async def run():
+        queue = JobQueue(AsyncMongoMockClient()["test"])
+        queue.job("email", max_attempts=2, backoff_seconds=30)(failing)
+        worker = JobWorker(queue, worker_id="worker-1")
+        job_id = await queue.enqueue("email", {"to": "a@example.com"})
+        job_type = queue.types["email"]
+
+        await worker._execute(job_type, await queue.claim(job_type, worker.worker_id))
+        retry = await queue.jobs.find_one({"_id": job_id})
+        await queue.jobs.update_one({"_id": job_id}, {"$set": {"run_at": datetime.now(timezone.utc)}})
+        await worker._execute(job_type, await queue.claim(job_type, worker.worker_id))
+        return retry, await queue.jobs.find_one({"_id": job_id})
+
+    retry, failed = asyncio.run(run())
+    assert retry["status"] == "queued" and retry["attempts"] == 1
+    assert retry["run_at"].replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(seconds=20)
+    assert failed["status"] == "failed" and failed["attempts"] == 2
+    assert "smtp down" in failed["last_error"]
+
+
+def test_stop_hands_unfinished_jobs_back():
+    started = asyncio.Event()
+
+    async def slow(payload):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        queue = JobQueue(AsyncMongoMockClient()["test"])
+        queue.job("email")(slow)
+        worker = JobWorker(queue, worker_id="worker-1", poll_interval=0.01)
+        job_id = await queue.enqueue("email")
+        await worker.start()
+        await asyncio.wait_for(started.wait(), 5)
+        await worker.stop()
+        return await queue.jobs.find_one({"_id": job_id})
+
+    job = asyncio.run(run())
+    # The interrupted run does not count as an attempt
+    assert job["status"] == "queued" and job["attempts"] == 0
+
+
+def test_worker_survives_unexpected_errors():
+    async def run():
+        queue = _queue()
+        worker = JobWorker(queue, worker_id="worker-1", poll_interval=0.01)
+        polls = 0
+        fire_schedules = queue.fire_schedules
+
+        async def flaky():
+            nonlocal polls
+            polls += 1
+            if polls == 1:
+                raise RuntimeError("boom")
+            await fire_schedules()
+
+        queue.fire_schedules = flaky
+        job_id = await queue.enqueue("email")
+        await worker.start()
+        for _ in range(100):
+            job = await queue.jobs.find_one({"_id": job_id})
+            if job["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return job
+
+    assert asyncio.run(run())["status"] == "done"
+
+
+def test_schedule_enqueues_each_run_once_across_workers():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        queues = []
+        for _ in range(2):
+            queue = JobQueue(db)
+            queue.job("report")(_noop)
+            queue.cron("nightly", "0 2 * * *", "report")
+            queues.append(queue)
+        await queues[0].fire_schedules()
+        # Make the schedule due, then let both workers race for it
+        await db.job_schedules.update_one({"_id": "nightly"}, {"$set": {"next_run_at": datetime.now(timezone.utc)}})
+        for queue in queues:
+            await queue.fire_schedules()
+        return await db.jobs.count_documents({"type": "report"})
+
+    assert asyncio.run(run()) == 1
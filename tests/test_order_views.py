@@ -0,0 +1,56 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from order_views import hydrate_orders, slim_stored_orders
+from tenancy import backfill_order_business_ids
+
+
+def _item(product_id, business_id):
+    return {
+        "product_id": product_id, "product_name": product_id, "price": 5.0, "quantity": 2,
+        "category": "Dry Cleaning", "business_id": business_id, "business_name": business_id,
+    }
+
+
+def _slim_and_hydrate(orders):
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        await db.businesses.insert_many([{"id": "b1", "name": "One"}, {"id": "b2", "name": "Two"}])
+        await db.orders.insert_many(orders)
+        slimmed = await slim_stored_orders(db)
+        stored = {order["id"]: order for order in await db.orders.find({}, {"_id": 0}).to_list(None)}
+        hydrated = {order["id"]: order for order in await hydrate_orders(db, list(stored.values()))}
+        return slimmed, hydrated
+
+    return asyncio.run(run())
+
+
+def test_slim_moves_single_business_onto_the_order():
+    slimmed, orders = _slim_and_hydrate([{"id": "o1", "items": [_item("p1", "b1"), _item("p2", "b1")]}])
+    assert slimmed == 1
+    assert orders["o1"]["business_id"] == "b1"
+    assert orders["o1"]["item_count"] == 4
+    assert [item["business_name"] for item in orders["o1"]["items"]] == ["One", "One"]
+
+
+def test_slim_keeps_each_business_of_mixed_orders():
+    slimmed, orders = _slim_and_hydrate([{"id": "o1", "items": [_item("p1", "b1"), _item("p2", "b2")]}])
+    assert slimmed == 1
+    assert "business_id" not in orders["o1"]
+    assert [(item["business_id"], item["business_name"]) for item in orders["o1"]["items"]] == [
+        ("b1", "One"), ("b2", "Two"),
+    ]
+
+
+def test_backfill_skips_mixed_business_orders():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        await db.orders.insert_many([
+            {"id": "single", "items": [_item("p1", "b1"), _item("p2", "b1")]},
+            {"id": "mixed", "items": [_item("p1", "b1"), _item("p2", "b2")]},
+        ])
+        backfilled = await backfill_order_business_ids(db)
+        return backfilled, {order["id"]: order.get("business_id") async for order in db.orders.find({})}
+
+    assert asyncio.run(run()) == (1, {"single": "b1", "mixed": None})
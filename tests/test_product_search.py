@@ -0,0 +1,41 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from product_search import ProductSearchIndex
+
+
+def _product(product_id, name, category="Dry Cleaning"):
+    return {"id": product_id, "business_id": "b1", "name": name, "category": category, "subcategory": "Tops"}
+
+
+def test_search_ranks_prefix_and_typo_matches():
+    index = ProductSearchIndex()
+    index.load([_product("p1", "Shirt"), _product("p2", "Shirt Dress"), _product("p3", "Duvet", "Household")])
+    assert [doc["id"] for doc in index.search("shir")] == ["p1", "p2"]
+    assert [doc["id"] for doc in index.search("duvte")] == ["p3"]
+    assert index.search("dress shirt")[0]["id"] == "p2"
+
+
+def test_full_refresh_swaps_in_a_new_index_and_keeps_concurrent_changes():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        await db.products.insert_many([_product("p1", "Shirt"), _product("p2", "Blouse")])
+        index = ProductSearchIndex()
+        await index.ensure_loaded(db.products)
+        assert len(index) == 2
+
+        await db.products.delete_one({"id": "p2"})
+        await db.products.insert_one(_product("p3", "Jacket"))
+        rebuild = asyncio.create_task(index.refresh(db.products))
+        await asyncio.sleep(0)
+        # A single-product write landing while the rebuild is in flight must survive the swap
+        await db.products.insert_one(_product("p4", "Trousers"))
+        await index.refresh(db.products, "p4")
+        await rebuild
+        return index
+
+    index = asyncio.run(run())
+    assert sorted(doc["id"] for doc in index._docs.values()) == ["p1", "p3", "p4"]
+    assert [doc["id"] for doc in index.search("trousers")] == ["p4"]
+    assert index.search("blouse") == []
@@ -0,0 +1,40 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from query_profiler import check_query_plans
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+
+def _mongo_available() -> bool:
+    try:
+        with MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000) as client:
+            client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+# mongomock has no query planner, so this needs a real MongoDB
+pytestmark = pytest.mark.skipif(not _mongo_available(), reason=f"No MongoDB reachable at {MONGO_URL}")
+
+
+def test_hot_path_queries_use_an_index():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(MONGO_URL)
+        db_name = f"query_guard_{uuid.uuid4().hex[:8]}"
+        try:
+            return await check_query_plans(client[db_name])
+        finally:
+            await client.drop_database(db_name)
+            client.close()
+
+    failures = asyncio.run(run())
+    assert failures == [], f"Hot-path queries plan a COLLSCAN: {', '.join(f['name'] for f in failures)}"
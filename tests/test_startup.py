@@ -0,0 +1,6 @@
+from check_startup import STARTUP_IMPORT_BUDGET_MS, best_import_times, budget_failures
+
+
+def test_server_import_stays_within_cold_start_budget():
+    # Runs `python -X importtime` in a subprocess, so modules already imported by other tests don't count
+    assert budget_failures(best_import_times(), STARTUP_IMPORT_BUDGET_MS) == []
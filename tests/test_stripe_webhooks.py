@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from stripe_webhooks import (
+    EVENTS_COLLECTION, PaymentEventProcessor, SignatureError, build_event, sign_payload, store_event,
+    to_minor_units, verify_signature,
+)
+
+SECRET = "whsec_test"
+
+
+def test_verify_signature_accepts_signed_fixture():
+    payload = json.dumps(build_event("payment_intent.succeeded", "pi_1")).encode()
+    verify_signature(payload, sign_payload(payload, SECRET), SECRET)
+
+
+def test_verify_signature_rejects_tampering_wrong_secret_and_replays():
+    payload = json.dumps(build_event("payment_intent.succeeded", "pi_1")).encode()
+    header = sign_payload(payload, SECRET)
+    with pytest.raises(SignatureError):
+        verify_signature(payload.replace(b"pi_1", b"pi_2"), header, SECRET)
+    with pytest.raises(SignatureError):
+        verify_signature(payload, header, "whsec_other")
+    with pytest.raises(SignatureError):
+        verify_signature(payload, sign_payload(payload, SECRET, int(time.time()) - 3600), SECRET)
+    with pytest.raises(SignatureError):
+        verify_signature(payload, "garbage", SECRET)
+
+
+def test_to_minor_units_rounds_float_prices():
+    assert [to_minor_units(amount) for amount in (8.95, 9.95, 8.45, 30)] == [895, 995, 845, 3000]
+
+
+def _process(orders, events):
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        await db.orders.insert_many([dict(order) for order in orders])
+        for event in events:
+            await store_event(db, event)
+        claimed = await PaymentEventProcessor(db).process_batch()
+        statuses = {order["id"]: order["payment_status"] async for order in db.orders.find({})}
+        event_statuses = {event["_id"]: event["status"] async for event in db[EVENTS_COLLECTION].find({})}
+        return claimed, statuses, event_statuses
+
+    return asyncio.run(run())
+
+
+def _order(order_id, intent_id, total, payment_status="pending"):
+    return {"id": order_id, "payment_intent_id": intent_id, "total_amount": total, "payment_status": payment_status}
+
+
+def test_process_batch_marks_exact_payment_paid():
+    event = build_event("payment_intent.succeeded", "pi_1", to_minor_units(8.95))
+    claimed, statuses, events = _process([_order("o1", "pi_1", 8.95)], [event])
+    assert claimed == 1
+    assert statuses == {"o1": "paid"}
+    assert events[event["id"]] == "processed"
+
+
+def test_process_batch_flags_amount_mismatch():
+    underpaid = build_event("payment_intent.succeeded", "pi_1", 100)
+    wrong_currency = build_event("payment_intent.succeeded", "pi_2", 3000)
+    wrong_currency["data"]["object"]["currency"] = "usd"
+    _, statuses, _ = _process([_order("o1", "pi_1", 30), _order("o2", "pi_2", 30)], [underpaid, wrong_currency])
+    assert statuses == {"o1": "amount_mismatch", "o2": "amount_mismatch"}
+
+
+def test_process_batch_late_failure_keeps_payment():
+    failed = build_event("payment_intent.payment_failed", "pi_1")
+    _, statuses, _ = _process([_order("o1", "pi_1", 30, payment_status="paid")], [failed])
+    assert statuses == {"o1": "paid"}
+
+
+def test_process_batch_uses_newest_event_per_intent():
+    failed = build_event("payment_intent.payment_failed", "pi_1")
+    succeeded = build_event("payment_intent.succeeded", "pi_1", 3000)
+    failed["created"], succeeded["created"] = 100, 200
+    _, statuses, _ = _process([_order("o1", "pi_1", 30)], [succeeded, failed])
+    assert statuses == {"o1": "paid"}
+
+
+def test_process_batch_leaves_unmatched_event_pending():
+    event = build_event("payment_intent.succeeded", "pi_unknown", 3000)
+    _, _, events = _process([_order("o1", "pi_1", 30)], [event])
+    assert events[event["id"]] == "pending"